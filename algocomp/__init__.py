@@ -1,16 +1,19 @@
 
 from .isqrt import isqrt
 from .ipow import ipow
-from .gcd import (xgcd, gcd, mod_inverse, partial_xgcd)
+from .gcd import (xgcd, gcd, mod_inverse, partial_xgcd,
+                  partial_xgcd_lehmer)
 from .int_div import (exact_div, divmod_min, mod_min)
 from .solve_linear import (solve_linear_x, solve_linear)
 
-from .bqf import (reduce_form, nudupl)
-from .cube import (print_cube_stats, construct_cube_with_squared_form,
-                   transform_cube, default_initial_cube)
+from .bqf import (reduce_form, reduce_form_full, nudupl, nucomp, nucube)
+from .cube import (print_cube_stats, cube_form1, cube_form3,
+                   construct_cube_with_squared_form, transform_cube,
+                   default_initial_cube)
 from .nudupl_cube import construct_nudupl_cube
+from .nucomp_cube import (construct_nucomp_cube, compose_with_cube)
 
 from .cost_tracking import (CostTracking, routine_tracking_start,
-                            routine_tracking_stop)
+                            routine_tracking_stop, CostModel, PowerCostModel,
+                            COST_MODELS, get_cost_model, set_production_mode)
 from .tracked_number import TrackedNumber
-
@@ -22,15 +22,21 @@ SOFTWARE.
 
 
 
-from .gcd import xgcd
+from .gcd import (xgcd, xgcd_mod, partial_xgcd_lehmer)
 from .isqrt import isqrt
 from .cost_tracking import (routine_tracking_start, routine_tracking_stop)
-from .tracked_number import coerce_int as _int
+from .tracked_number import (coerce_int as _int, is_tracked)
 from .int_div import exact_div
 
 
-def reduce_form(a,b,c):
-    """calculates  partially reduced binary quadratic form"""
+def reduce_form(a,b,c, full=False):
+    """
+    calculates  partially reduced binary quadratic form
+
+    with full=True, calculates the fully reduced form (see reduce_form_full)
+    """
+    if full:
+        return reduce_form_full(a,b,c)[:3]
     a0,b0,c0 = a,b,c
 
     # -- normalize form --
@@ -64,10 +70,125 @@ def reduce_form(a,b,c):
     return (a,b,c)
 
 
-def nudupl(a,b,c, L=None):
+def _form_action(a,b,c, p,q,r,s):
+    """
+    apply the matrix |p q| to the form, that is (x,y) -> (px + qy, rx + sy)
+                     |r s|
+    """
+    a2 = a*p*p + b*p*r + c*r*r
+    b2 = 2*(a*p*q + c*r*s) + b*(p*s + q*r)
+    c2 = a*q*q + b*q*s + c*s*s
+    return (a2,b2,c2)
+
+
+def _reduce_steps(a,b,c, word_bits):
+    """
+    Run the reduction steps on approximations a,b,c (leading words) of a
+    form, accumulating the transformation matrix.
+    (for TrackedNumbers, the word arithmetic is charged)
+
+    return (p,q,r,s, nstep)
+
+    Stops once the approximations are reduced, or have lost too much
+    precision relative to the size of the matrix to be trusted.
+    """
+    p,q,r,s = 1,0,0,1
+    nstep = 0
+    limit = 1 << (word_bits//2)
+    while a > limit and c > limit:
+        m = max(abs(p), abs(q), abs(r), abs(s))
+        if (m*m) << 8 > a or (m*m) << 8 > c:
+            break
+        if c < a:
+            # |0 -1|
+            # |1  0|
+            a, b, c = c, -b, a
+            p, q, r, s = q, -p, s, -r
+        if -a < b <= a:
+            if a <= c:
+                break
+            continue
+        # |1 -n|
+        # |0  1|
+        n = -((a - b) // (2*a))  # b - 2*a*n in (-a, a]
+        an = a*n
+        b = b - an
+        c = c - n*b
+        b = b - an
+        q, s = q - n*p, s - n*r
+        nstep += 1
+    return (p,q,r,s, nstep)
+
+
+def reduce_form_full(a,b,c, word_bits=64):
+    """
+    calculates the fully reduced binary quadratic form
+        |b| <= a <= c,  and b >= 0 if |b| = a or a = c
+
+    returns (a,b,c, nstep) where nstep is the number of reduction steps
+    (normalizations, each of which is a division in the simple algorithm)
+
+    ---
+    Algorithm
+
+    The simple algorithm alternates normalizing b into (-a, a], and
+    swapping (a,b,c) -> (c,-b,a) while c < a.
+    Each normalization is a full width division, so instead the steps are
+    first run on the leading words of a,b,c (see _reduce_steps), and the
+    accumulated matrix is applied to the full form once per batch.
+
+    As a reduced form is unique, this gives the same result as the simple
+    algorithm, the approximation only changes how the steps are batched.
+    If a batch doesn't make progress, a single full width step is done.
+
+    The leading words are taken with a shift, and the steps on them are
+    charged as TrackedNumber arithmetic at word size, as in
+    partial_xgcd_lehmer.
+    Plain ints run the simple algorithm, as a division is cheap on them.
+    """
+    tracking = routine_tracking_start("reduce_form_full", a, b, c)
+
+    batch = is_tracked(a, b, c)
+    nstep = 0
+    while True:
+        if c < a:
+            a, b, c = c, -b, a
+        if -a < b <= a and a <= c:
+            break
+
+        if batch:
+            shift = max(_int(a).bit_length(), _int(c).bit_length()) - word_bits
+        else:
+            shift = 0
+        if shift > 0:
+            p,q,r,s, n = _reduce_steps(a >> shift, b >> shift, c >> shift,
+                                       word_bits)
+            if n:
+                a2,b2,c2 = _form_action(a,b,c, p,q,r,s)
+                if a2 <= a:
+                    a,b,c = a2,b2,c2
+                    nstep += n
+                    continue
+
+        # single full width normalization
+        n = -((a - b) // (2*a))  # b - 2*a*n in (-a, a], even for b = -a
+        an = a*n
+        b = b - an
+        c = c - n*b
+        b = b - an
+        nstep += 1
+
+    if a == c and b < 0:
+        b = -b
+
+    routine_tracking_stop(tracking)
+    return (a,b,c, nstep)
+
+
+def nudupl(a,b,c, L=None, full=False):
     """
     calculates squared binary quadratic form composition
-    returns reduced form
+    returns reduced form (partially reduced, or fully reduced if full=True)
 
     from:
     'A Course in Computational Algebraic Number Theory', Henri Cohen
@@ -80,8 +201,8 @@ def nudupl(a,b,c, L=None):
         L = isqrt(isqrt(abs(b*b-4*a*c)//4))
 
     # -- Euclidean step --
-    # u b + v a = d1 = gcd(b,a)
-    d1,u,v = xgcd(b,a)
+    # u b + v a = d1 = gcd(b,a), only u mod a is needed
+    d1,u = xgcd_mod(b,a)
     A = a//d1
     B = b//d1
     C = (-c*u)%A
@@ -123,7 +244,7 @@ def nudupl(a,b,c, L=None):
         c2 = v3*v3
         b2 = b + (d+v3)*(d+v3) - a2 - c2
         c2 = c2 + g*d1
-        return reduce_form(a2,b2,c2)
+        return reduce_form(a2,b2,c2, full)
 
     # -- final computations --
     e = exact_div(c*v+B*d, A)
@@ -139,4 +260,203 @@ def nudupl(a,b,c, L=None):
     a2 = a2 + e*v
     c2 = c2 + g*v2
 
-    return reduce_form(a2,b2,c2)
+    return reduce_form(a2,b2,c2, full)
+
+
+def nucomp(a1,b1,c1, a2,b2,c2, L=None, full=False):
+    """
+    calculates the composition of two binary quadratic forms of the same
+    discriminant
+    returns reduced form (partially reduced, or fully reduced if full=True)
+
+    from:
+    'A Course in Computational Algebraic Number Theory', Henri Cohen
+    Algorithm 5.4.9 (NUCOMP) page 244
+    (with y1 = 1 when a2 | a1, so that u a2 + v a1 = d holds in that case)
+    """
+
+    # L should be precomputed, but for convenience/testing
+    # added support for calculating it here
+    if L is None:
+        L = isqrt(isqrt(abs(b1*b1-4*a1*c1)//4))
+
+    tracking = routine_tracking_start("nucomp", a1, b1, c1, a2, b2, c2)
+
+    # -- Initialize --
+    if a1 < a2:
+        a1,b1,c1, a2,b2,c2 = a2,b2,c2, a1,b1,c1
+    s = (b1+b2)//2
+    n = b2 - s
+
+    # -- First Euclidean step --
+    # u a2 + v a1 = d = gcd(a2,a1)
+    if a1 % a2 == 0:
+        y1 = 1
+        d = a2
+    else:
+        d,u,v = xgcd(a2,a1)
+        y1 = u
+
+    # -- Second Euclidean step --
+    # x2 s + y2 d = d1 = gcd(s,d)
+    if s % d == 0:
+        y2 = -1
+        x2 = 0
+        d1 = d
+    else:
+        d1,x2,y2 = xgcd(s,d)
+        y2 = -y2
+
+    # -- Compose --
+    A1 = a1//d1
+    A2 = a2//d1
+    S = s//d1
+    C = (y1*y2*n - x2*c2)%A1
+    C1 = A1 - C
+    if C1 < C:
+        C = -C1
+
+    # -- Partial reduction --
+    # PARTEUCL(A1,C), as in nudupl
+    v = 0
+    d = A1
+    v2 = 1
+    v3 = C
+    z = 0
+    while abs(v3) > L:
+        q, t3 = divmod(d, v3)  # d = q v3 + t3
+        t2 = v - q*v2
+        v = v2
+        d = v3
+        v2 = t2
+        v3 = t3
+        z = z + 1
+    if (z%2):
+        v2 = -v2
+        v3 = -v3
+
+    # -- Special case --
+    if z == 0:
+        Q1 = A2*v3
+        f = exact_div(Q1+n, d)
+        g = exact_div(v3*S+c2, d)
+        a3 = d*A2
+        b3 = 2*Q1 + b2
+        c3 = v3*f + g*d1
+        routine_tracking_stop(tracking)
+        return reduce_form(a3,b3,c3, full)
+
+    # -- Final computations --
+    b = exact_div(A2*d + n*v, A1)
+    Q1 = b*v3
+    Q2 = Q1 + n
+    f = exact_div(Q2, d)
+    e = exact_div(S*d + c2*v, A1)
+    Q3 = e*v2
+    Q4 = Q3 - S
+    g = exact_div(Q4, v)
+    if d1 > 1:
+        v2 = d1*v2
+        v = d1*v
+    a3 = d*b + e*v
+    b3 = Q1 + Q2 + d1*(Q3 + Q4)
+    c3 = v3*f + g*v2
+
+    routine_tracking_stop(tracking)
+    return reduce_form(a3,b3,c3, full)
+
+
+def nucube(a,b,c, L=None, full=False):
+    """
+    calculates the cube of a binary quadratic form
+    returns reduced form (partially reduced, or fully reduced if full=True)
+
+    based on NUCUBE from:
+    'Fast ideal cubing in imaginary quadratic number and function fields',
+    Imbert, Jacobson, Schmidt (2010)
+
+    ---
+    Algorithm
+
+    If gcd(a,b) = 1 (always the case for a prime discriminant), the cube
+    is (a^3, b + 2aK, ...) where K solves
+        a K^2 + b K + c = 0  (mod a^2)
+    which is found from k = -c/b (mod a), lifted to K = k + a j.
+
+    This is NUCOMP (Cohen Algorithm 5.4.9) of the unreduced square
+    (a^2, b + 2ak, ...) with (a,b,c), where d1 = 1, s = b + ak, n = -ak,
+    and the final computations don't need the c of the square.
+    So a single partial Euclid on (a^2, K) is used, stopping at
+    sqrt(a) L rather than L as the composed forms are of different size.
+    (any quotient choice works here, so partial_xgcd_lehmer is used)
+
+    If gcd(a,b) > 1 this falls back to nucomp(nudupl(f), f).
+    """
+
+    # L should be precomputed, but for convenience/testing
+    # added support for calculating it here
+    if L is None:
+        L = isqrt(isqrt(abs(b*b-4*a*c)//4))
+
+    tracking = routine_tracking_start("nucube", a, b, c)
+
+    # -- Euclidean step --
+    # u b + v a = d1 = gcd(b,a), only u mod a is needed
+    d1,u = xgcd_mod(b,a)
+    if d1 != 1:
+        routine_tracking_stop(tracking)
+        a2,b2,c2 = nudupl(a,b,c, L)
+        return nucomp(a2,b2,c2, a,b,c, L, full)
+
+    # -- Solve a K^2 + b K + c = 0 (mod a^2) --
+    k = (-c*u)%a
+    t = exact_div(a*k*k + b*k + c, a)
+    j = (-t*u)%a
+    A1 = a*a
+    C = k + a*j
+    C1 = A1 - C
+    if C1 < C:
+        C = -C1
+    S = b + a*k
+    n = -a*k
+
+    # -- Partial reduction --
+    # the same reduction as PARTEUCL(A1,C) in nudupl, but with the Lehmer
+    # accelerated partial_xgcd (A1 is twice the size here):
+    #   d x + v3 y = A1, |v3| <= sqrt(a) L
+    # which matches v2 d - v v3 = A1 with v2 = x, v = -y
+    bound = isqrt(a)*L
+    d, v2, v3, v = partial_xgcd_lehmer(A1, C, bound)
+    if d == 0:
+        # the remainders went from above the bound to gcd(A1,C) and then
+        # 0 in one step, take the last nonzero one as d (the same
+        # equation with the roles swapped), v3 = 0
+        d, v2, v3, v = v3, v, d, -v2
+    v = -v
+
+    # -- Special case --
+    if v == 0:
+        Q1 = a*v3
+        f = exact_div(Q1+n, d)
+        g = exact_div(v3*S+c, d)
+        a3 = d*a
+        b3 = 2*Q1 + b
+        c3 = v3*f + g
+        routine_tracking_stop(tracking)
+        return reduce_form(a3,b3,c3, full)
+
+    # -- Final computations --
+    b2 = exact_div(a*d + n*v, A1)
+    Q1 = b2*v3
+    Q2 = Q1 + n
+    f = exact_div(Q2, d)
+    e = exact_div(S*d + c*v, A1)
+    Q3 = e*v2
+    Q4 = Q3 - S
+    g = exact_div(Q4, v)
+    a3 = d*b2 + e*v
+    b3 = Q1 + Q2 + Q3 + Q4
+    c3 = v3*f + g*v2
+
+    routine_tracking_stop(tracking)
+    return reduce_form(a3,b3,c3, full)
@@ -22,9 +22,207 @@ SOFTWARE.
 
 from .tracked_number import (coerce_int, TrackedNumber)
 from math import log
+import importlib
+import json
+
+OPERATIONS = ("add", "sub", "mul", "div", "shift")
+
+
+# -- Cost models
+#   the cost of each basic operation, given the bit lengths of the operands
+
+class CostModel:
+    """
+    The contest cost model:
+        add, sub, shift   O(n)
+        mul               ~ Karatsuba, (x+y)^1.6
+        div               ~ Burnikel-Ziegler, log(x+y) (x+y)^1.6
+    """
+    name = "contest"
+
+    def add(self, xbits, ybits):
+        return xbits if xbits > ybits else ybits
+
+    def sub(self, xbits, ybits):
+        return xbits if xbits > ybits else ybits
+
+    def mul(self, xbits, ybits):
+        return int(float(xbits + ybits)**1.6)
+
+    def div(self, xbits, ybits):
+        bits = float(xbits + ybits)
+        if bits:
+            return int( log(bits) * (bits**1.6) )
+        return 0
+
+    def shift(self, xbits, n):
+        return xbits
+
+    def to_dict(self):
+        return {"name": self.name}
+
+
+class PowerCostModel(CostModel):
+    """
+    A cost model from the asymptotic cost of multiplication:
+        add, sub     max(x, y)
+        shift        x
+        mul          M(x, y)
+        div          M(q, y), times log2(y) if fast_division,
+                     for the q = x - y + 1 bit quotient
+    where M(x, y) = max(x, y) min(x, y)^(mul_exponent - 1), so n by n
+    bits costs n^mul_exponent, and an unbalanced product is done as
+    max/min balanced ones.
+
+    The cost of an operation is overheads[op] + scales[op] times the
+    above (by default 0 and 1), rounded to an int.
+    """
+
+    def __init__(self, name, mul_exponent, fast_division, scales=None,
+                 overheads=None):
+        self.name = name
+        self.mul_exponent = mul_exponent
+        self.fast_division = fast_division
+        self.scales = dict((op, 1.0) for op in OPERATIONS)
+        self.scales.update(scales or {})
+        self.overheads = dict((op, 0.0) for op in OPERATIONS)
+        self.overheads.update(overheads or {})
+
+    def shape(self, op, xbits, ybits):
+        """the cost of op before the scale and overhead"""
+        if op in ("add", "sub"):
+            return xbits if xbits > ybits else ybits
+        if op == "shift":
+            return xbits
+        if op == "div":
+            q = xbits - ybits + 1
+            if q <= 0:
+                return 0.0
+            c = self._M(q, ybits)
+            if self.fast_division and ybits > 1:
+                c *= log(ybits, 2)
+            return c
+        return self._M(xbits, ybits)
+
+    def _M(self, xbits, ybits):
+        if xbits < ybits:
+            xbits, ybits = ybits, xbits
+        if ybits == 0:
+            return 0.0
+        return xbits * float(ybits)**(self.mul_exponent - 1)
+
+    def cost(self, op, xbits, ybits):
+        return int(round(self.overheads[op] +
+                         self.scales[op] * self.shape(op, xbits, ybits)))
+
+    def add(self, xbits, ybits):
+        return self.cost("add", xbits, ybits)
+
+    def sub(self, xbits, ybits):
+        return self.cost("sub", xbits, ybits)
+
+    def mul(self, xbits, ybits):
+        return self.cost("mul", xbits, ybits)
+
+    def div(self, xbits, ybits):
+        return self.cost("div", xbits, ybits)
+
+    def shift(self, xbits, n):
+        return self.cost("shift", xbits, n)
+
+    def to_dict(self):
+        return {"name": self.name, "mul_exponent": self.mul_exponent,
+                "fast_division": self.fast_division,
+                "scales": self.scales, "overheads": self.overheads}
+
+
+COST_MODELS = {
+    "contest": CostModel(),
+    "schoolbook": PowerCostModel("schoolbook", 2.0, False),
+    "karatsuba": PowerCostModel("karatsuba", log(3, 2), True),
+    "toom3": PowerCostModel("toom3", log(5, 3), True),
+}
+
+
+def cost_model_from_dict(d):
+    """a cost model from its to_dict(), such as from a calibration file"""
+    d = dict(d)
+    if "mul_exponent" not in d:
+        return COST_MODELS[d["name"]]
+    return PowerCostModel(**d)
+
+
+def get_cost_model(model):
+    """
+    a cost model given a model, the name of one of COST_MODELS, or the
+    path of a JSON file written by calibrate_costs.py
+    """
+    if model is None:
+        return COST_MODELS["contest"]
+    if isinstance(model, CostModel):
+        return model
+    if model in COST_MODELS:
+        return COST_MODELS[model]
+    with open(model) as f:
+        return cost_model_from_dict(json.load(f))
+
+
+class ProfileNode:
+    """
+    A node of the call tree recorded by CostTracking(profile=True),
+    one per call path.
+
+    cost and ops (the count and cost of each basic operation, in the
+    order of OPERATIONS) are inclusive of the routines called from it.
+    """
+    __slots__ = ("name", "calls", "cost", "ops", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.cost = 0
+        self.ops = [0] * (2 * len(OPERATIONS))
+        self.children = {}
+
+    def exclusive_cost(self):
+        return self.cost - sum(c.cost for c in self.children.values())
+
+    def exclusive_ops(self):
+        ops = list(self.ops)
+        for child in self.children.values():
+            for i, x in enumerate(child.ops):
+                ops[i] -= x
+        return ops
+
+    def to_dict(self):
+        def op_dict(ops):
+            n = len(OPERATIONS)
+            return dict((name, {"count": ops[i], "cost": ops[n + i]})
+                        for i, name in enumerate(OPERATIONS))
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "inclusive_cost": self.cost,
+            "exclusive_cost": self.exclusive_cost(),
+            "inclusive_operations": op_dict(self.ops),
+            "exclusive_operations": op_dict(self.exclusive_ops()),
+            "children": [c.to_dict() for c in self.children.values()],
+        }
+
+    def walk(self, path=()):
+        """yields (path, node) for this node and all below it"""
+        path = path + (self.name,)
+        yield path, self
+        for child in self.children.values():
+            yield from child.walk(path)
+
 
 class CostTracking:
-    def __init__(self):
+    def __init__(self, profile=False, model=None):
+        # model: the cost model, see get_cost_model (default: contest)
+        if production_mode:
+            set_production_mode(False)
+        self.model = get_cost_model(model)
         self._last = 0
         self.cost = 0
         # details on fundemental operations
@@ -32,13 +230,23 @@ class CostTracking:
         self.num_sub = 0
         self.num_mul = 0
         self.num_div = 0
+        self.num_shift = 0
         self.cost_add = 0
         self.cost_sub = 0
         self.cost_mul = 0
         self.cost_div = 0
+        self.cost_shift = 0
         # details on algorithms/routines
         self.num_routine = {}
         self.cost_routine = {}
+        # call tree of the routines, when profiling
+        #   the stack has (node, cost, operation snapshot) at routine start
+        self._profile_root = None
+        self._profile_stack = None
+        if profile:
+            self._profile_root = ProfileNode("total")
+            self._profile_stack = [(self._profile_root, self.cost,
+                                    self._operation_snapshot())]
 
     def NewNumber(self, value=0):
         """obtain a new cost tracked number which uses this cost tracking"""
@@ -54,11 +262,15 @@ class CostTracking:
         total = float(self.cost)
         s  =  "total cost: {} ({:.2e})\n".format(self.cost, total)
         s += ("basic operation counts:\n"
-              "    add:{:.2e}, sub:{:.2e}, mul:{:.2e}, div:{:.2e}\n".format(
-                self.num_add, self.num_sub, self.num_mul, self.num_div))
+              "    add:{:.2e}, sub:{:.2e}, mul:{:.2e}, div:{:.2e}, "
+              "shift:{:.2e}\n".format(
+                self.num_add, self.num_sub, self.num_mul, self.num_div,
+                self.num_shift))
         s += ("basic operation costs:\n"
-              "    add:{:.2e}, sub:{:.2e}, mul:{:.2e}, div:{:.2e}\n".format(
-                self.cost_add, self.cost_sub, self.cost_mul, self.cost_div))
+              "    add:{:.2e}, sub:{:.2e}, mul:{:.2e}, div:{:.2e}, "
+              "shift:{:.2e}\n".format(
+                self.cost_add, self.cost_sub, self.cost_mul, self.cost_div,
+                self.cost_shift))
         if len(self.num_routine):
             algo_names = [name for name in self.num_routine]
             algo_names.sort()
@@ -76,6 +288,61 @@ class CostTracking:
             s += "    {}\n".format(", ".join(cost_details))
         return s
 
+    # --- call tree profiles ---
+
+    def profile(self):
+        """
+        The root ProfileNode of the call tree, covering all the cost since
+        this CostTracking was created with profile=True.
+        """
+        if self._profile_root is None:
+            raise ValueError("CostTracking was not created with profile=True")
+        root, cost, snapshot = self._profile_stack[0]
+        root.calls = 1
+        root.cost = self.cost - cost
+        root.ops = [x - y for x, y in
+                    zip(self._operation_snapshot(), snapshot)]
+        return root
+
+    def profile_folded(self):
+        """
+        The profile in the folded stack format of flamegraph.pl:
+        one line per call path, with its exclusive cost.
+        """
+        lines = []
+        for path, node in self.profile().walk():
+            cost = node.exclusive_cost()
+            if cost:
+                lines.append("{} {}".format(";".join(path), cost))
+        return "\n".join(lines) + "\n"
+
+    def profile_json(self, **kwargs):
+        """The profile as JSON, kwargs are passed to json.dumps"""
+        return json.dumps(self.profile().to_dict(), **kwargs)
+
+    def profile_by_routine(self):
+        """
+        Exclusive cost of each routine over all its call paths, and its
+        inclusive cost, not counting recursive calls twice, largest first.
+
+        returns a list of (name, exclusive cost, inclusive cost)
+        """
+        exclusive = {}
+        inclusive = {}
+        for path, node in self.profile().walk():
+            name = node.name
+            exclusive[name] = exclusive.get(name, 0) + node.exclusive_cost()
+            if name not in path[:-1]:
+                inclusive[name] = inclusive.get(name, 0) + node.cost
+        return sorted(((name, exclusive[name], inclusive[name])
+                       for name in exclusive),
+                      key=lambda x: x[1], reverse=True)
+
+    def _operation_snapshot(self):
+        return (self.num_add, self.num_sub, self.num_mul, self.num_div,
+                self.num_shift, self.cost_add, self.cost_sub, self.cost_mul,
+                self.cost_div, self.cost_shift)
+
 
     # --- a normal user should not need to use the routines below directly ---
     # they are the necessary interface for a number-like object to hook into
@@ -93,41 +360,53 @@ class CostTracking:
     # to be ranked mostly by (div, mul, add+sub).
 
     def add(self, x, y):
-        # O(n)
-        c = max(x.bit_length(), y.bit_length())
+        self.add_bits(x.bit_length(), y.bit_length())
+
+    def sub(self, x, y):
+        self.sub_bits(x.bit_length(), y.bit_length())
+
+    def mul(self, x, y):
+        self.mul_bits(x.bit_length(), y.bit_length())
+
+    def div(self, x, y):
+        self.div_bits(x.bit_length(), y.bit_length())
+
+    def shift(self, x, n):
+        self.shift_bits(x.bit_length(), n)
+
+    # the same, but given the bit lengths of the operands
+    #   (TrackedNumber caches the bit length of its value)
+
+    def add_bits(self, xbits, ybits):
+        c = self.model.add(xbits, ybits)
         self.num_add += 1
         self.cost_add += c
         self.cost += c
 
-    def sub(self, x, y):
-        # O(n)
-        c = max(x.bit_length(), y.bit_length())
+    def sub_bits(self, xbits, ybits):
+        c = self.model.sub(xbits, ybits)
         self.num_sub += 1
         self.cost_sub += c
         self.cost += c
 
-    def mul(self, x, y):
-        # ~ Karatsuba algorithm
-        #   nbit x nbit takes O(n^1.6)
-        #   unsure what constants to use
-        bits = float(x.bit_length() + y.bit_length())
-        c = int(bits**1.6)
+    def mul_bits(self, xbits, ybits):
+        c = self.model.mul(xbits, ybits)
         self.num_mul += 1
         self.cost_mul += c
         self.cost += c
 
-    def div(self, x, y):
-        # ~ Burnikel-Ziegler divide-and-conquer division
-        #  nbit / nbit takes O( M(n) log n )
-        bits = float(x.bit_length() + y.bit_length())
-        if bits:
-            c = int( log(bits) * (bits**1.6) )
-        else:
-            c = 0
+    def div_bits(self, xbits, ybits):
+        c = self.model.div(xbits, ybits)
         self.num_div += 1
         self.cost_div += c
         self.cost += c
 
+    def shift_bits(self, xbits, n):
+        c = self.model.shift(xbits, n)
+        self.num_shift += 1
+        self.cost_shift += c
+        self.cost += c
+
     def routine_start(self, name):
         # the actual routine/algorithm calculate the cost
         # so costs will also be counted in add,mul,etc.
@@ -136,9 +415,30 @@ class CostTracking:
             self.cost_routine[name] = 0
         else:
             self.num_routine[name] += 1
+        if self._profile_stack is not None:
+            children = self._profile_stack[-1][0].children
+            node = children.get(name)
+            if node is None:
+                node = children[name] = ProfileNode(name)
+            self._profile_stack.append((node, self.cost,
+                                        self._operation_snapshot()))
 
     def routine_stop(self, name, initial):
         self.cost_routine[name] += self.cost - initial
+        if self._profile_stack is not None:
+            stack = self._profile_stack
+            # a routine which didn't stop (such as from an exception)
+            # is closed along with its caller
+            if not any(node.name == name for node, _, _ in stack[1:]):
+                return
+            while True:
+                node, cost, snapshot = stack.pop()
+                node.calls += 1
+                node.cost += self.cost - cost
+                for i, x in enumerate(self._operation_snapshot()):
+                    node.ops[i] += x - snapshot[i]
+                if node.name == name:
+                    break
 
 
 # -- Helpers for tracking cost of routines
@@ -165,3 +465,44 @@ def routine_tracking_stop(tracking_data):
     if ct:
         ct.routine_stop(name, initial)
 
+
+
+# -- Production mode
+#   for runs on plain ints, picked once at setup time (see entry.setup)
+
+# modules of the routines, which have the routine tracking helpers and
+# a CHECKS flag for their consistency checks
+_ROUTINE_MODULES = ("bqf", "cube", "gcd", "int_div", "nucomp_cube",
+                    "nudupl_cube", "solve_linear")
+
+production_mode = False
+
+
+def _no_tracking_start(name, *var_list):
+    return None
+
+def _no_tracking_stop(tracking_data):
+    pass
+
+def set_production_mode(enabled):
+    """
+    In production mode the routines run with no-op routine tracking
+    helpers and skip their consistency checks, so plain ints take no
+    tracking overhead at all.
+
+    The routine costs of TrackedNumbers are not counted in production
+    mode, so a new CostTracking turns it off again.
+    """
+    global production_mode
+    if enabled:
+        start, stop = _no_tracking_start, _no_tracking_stop
+    else:
+        start, stop = routine_tracking_start, routine_tracking_stop
+    for name in _ROUTINE_MODULES:
+        # (algocomp.gcd is the function, so look the module up by name)
+        module = importlib.import_module("." + name, __package__)
+        if hasattr(module, "routine_tracking_start"):
+            module.routine_tracking_start = start
+            module.routine_tracking_stop = stop
+        module.CHECKS = not enabled
+    production_mode = enabled
@@ -23,6 +23,9 @@ from .tracked_number import coerce_int as _int
 from .isqrt import isqrt
 from .solve_linear import *
 
+# consistency checks, off in production mode (see set_production_mode)
+CHECKS = True
+
 
 def print_cube_stats(cube):
     """for debugging: given a cube as a tuple of 8 values, print some stats"""
@@ -50,6 +53,24 @@ def print_cube_stats(cube):
     print(' (B1-B2)/2 = {}'.format(b*g -d*e))
 
 
+def cube_form1(cube):
+    """given a cube as a tuple of 8 values, return form 1 (A1,B1,C1)"""
+    a,b,c,d,e,f,g,h = cube
+    A1 = b*c - a*d
+    B1 = -a*h + b*g + c*f - d*e
+    C1 = f*g - e*h
+    return (A1, B1, C1)
+
+
+def cube_form3(cube):
+    """given a cube as a tuple of 8 values, return form 3 (A3,B3,C3)"""
+    a,b,c,d,e,f,g,h = cube
+    A3 = b*e - a*f
+    B3 = -a*h + b*g - c*f + d*e
+    C3 = d*g - c*h
+    return (A3, B3, C3)
+
+
 def construct_cube_with_squared_form(A, B, C):
     """
     Quick simple construction of a cube with (A1,B1,C1)=(A2,B2,C2)=(A,B,C).
@@ -95,7 +116,8 @@ def transform_cube(cube, r,s,t,u):
     """
 
     # sanity check that transform has determinant 1
-    assert _int(r)*_int(u) - _int(s)*_int(t) == 1
+    if CHECKS:
+        assert _int(r)*_int(u) - _int(s)*_int(t) == 1
 
     a,b,c,d,e,f,g,h = cube
 
@@ -1,10 +1,15 @@
 
+from .cost_tracking import (routine_tracking_start, routine_tracking_stop)
+
+
 def exact_div(a, b):
     """
     performs integer division: a/b, with expectation that result is exact
     raises ValueError exception if b does not divide a
     """
+    tracking = routine_tracking_start("exact_div", a, b)
     q, r = divmod(a, b)
+    routine_tracking_stop(tracking)
     if r != 0:
         raise ValueError("dividend is not multiple of divisor")
     return q
@@ -1,34 +1,227 @@
+"""
+generic exponentiation
 
-def ipow(a,b):
+ipow works on anything with a multiplication: plain ints, TrackedNumbers
+(so the cost of the multiplications is tracked), and group elements such as
+inkfish's ClassGroup forms, which provide identity(), square() and a cheap
+inverse().
+
+strategies:
+  "binary"   left to right square and multiply
+  "sliding"  sliding window over the exponent bits, odd powers table
+  "wnaf"     width w non adjacent form, needs inverse(), odd powers table
+  "fixed"    fixed window of w bits, table of all powers below 2^w
+
+by default the strategy is wNAF when the base can be inverted and sliding
+window otherwise, with the window picked from the exponent length
+"""
+
+STRATEGIES = ("binary", "sliding", "wnaf", "fixed")
+
+
+def ipow(a, b, strategy=None, window=None, stats=None):
     """
-    returns pow(a,b) for integers
+    returns pow(a,b) for integers, or for group elements
 
     constructed in terms of lower arithmetic to be compatible
     with cost calculations
+
+    if stats is a dict, the number of squarings, multiplications and
+    inversions done is added to it
+
+    a TrackedNumber exponent is charged a division by 2 per bit, as the
+    bit by bit divmod(b,2) scan of the simple version cost
     """
+    group = hasattr(a, "identity")
 
     # quick special cases
+    if not group:
+        if b == 0:
+            return 1
+        if a == 0:
+            return 0
+        if a == 1:
+            return 1
+        if a == -1:
+            if (b%2) == 1:
+                return -1
+            return 1
+    b = _exponent(b)
+    if b < 0:
+        if not hasattr(a, "inverse"):
+            raise ValueError('ipow not defined for negative exponent and |base|>1')
+        a = a.inverse()
+        b = -b
+        _count(stats, "inversions")
     if b == 0:
+        return a.identity()
+
+    if strategy is None:
+        strategy = "wnaf" if hasattr(a, "inverse") else "sliding"
+    if strategy not in STRATEGIES:
+        raise ValueError("unknown ipow strategy {!r}".format(strategy))
+    if strategy == "wnaf" and not hasattr(a, "inverse"):
+        raise ValueError('ipow wnaf strategy needs a base with inverse()')
+    if window is None:
+        window = choose_window(b.bit_length(), strategy)
+
+    if strategy == "binary" or window == 1:
+        return _binary(a, b, stats)
+    if strategy == "sliding":
+        return _sliding(a, b, window, stats)
+    if strategy == "wnaf":
+        return _wnaf(a, b, window, stats)
+    return _fixed(a, b, window, stats)
+
+
+def ipow_cost(bits, strategy, window):
+    """
+    approximate number of (squarings, multiplications) for an exponent of
+    the given bit length, including the table
+    """
+    if strategy == "binary" or window == 1:
+        return bits - 1, bits // 2
+    if strategy == "sliding":
+        return bits, (1 << (window - 1)) - 1 + bits // (window + 1)
+    if strategy == "wnaf":
+        return bits + 1, (1 << (window - 2)) - 1 + bits // (window + 1)
+    if strategy == "fixed":
+        return bits, (1 << window) - 2 + bits // window
+    raise ValueError("unknown ipow strategy {!r}".format(strategy))
+
+
+def choose_window(bits, strategy):
+    """the window size with the fewest multiplications for the exponent length"""
+    if strategy == "binary":
         return 1
-    if a == 0:
-        return 0
-    if a == 1:
-        return 1
-    if a == -1:
-        if (b%2) == 1:
-            return -1
-        return 1
-    if b < 0:
-        raise ValueError('ipow not defined for negative exponent and |base|>1')
+    best = 1
+    best_cost = ipow_cost(bits, "binary", 1)[1]
+    # wnaf needs a window of at least 2
+    for w in range(2, 16):
+        cost = ipow_cost(bits, strategy, w)[1]
+        if cost < best_cost:
+            best, best_cost = w, cost
+    return best
 
-    val = 1
-    while True:
-        b,bit = divmod(b,2)
-        if bit:
-            val = val*a   # no *= to allow cost calculation
-        if b == 0:
-            break
-        a = a*a   # no *= to allow cost calculation
 
+def _exponent(b):
+    # the strategies read the bits of the exponent directly, so charge a
+    # TrackedNumber exponent for its scan like the right to left
+    #   b,bit = divmod(b,2)
+    # loop did, then use its value
+    if isinstance(b, int):
+        return b
+    ct = b.costTracking
+    for bits in range(abs(b.value).bit_length(), 0, -1):
+        ct.div_bits(bits, 2)
+    return b.value
+
+
+def _count(stats, key, n=1):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + n
+
+
+def _square(x, stats):
+    _count(stats, "squarings")
+    if hasattr(x, "square"):
+        return x.square()
+    return x*x   # no **2 to allow cost calculation
+
+
+def _mul(x, y, stats):
+    # x is None for the identity
+    if x is None:
+        return y
+    _count(stats, "multiplications")
+    return x*y
+
+
+def _odd_powers(a, count, stats):
+    """[a, a^3, a^5, ...] with count entries"""
+    table = [a]
+    if count > 1:
+        a2 = _square(a, stats)
+        for _ in range(count - 1):
+            table.append(_mul(table[-1], a2, stats))
+    return table
+
+
+def _binary(a, b, stats):
+    val = a
+    for i in range(b.bit_length() - 2, -1, -1):
+        val = _square(val, stats)
+        if (b >> i) & 1:
+            val = _mul(val, a, stats)
     return val
 
+
+def _sliding(a, b, w, stats):
+    table = _odd_powers(a, 1 << (w - 1), stats)
+    val = None
+    i = b.bit_length() - 1
+    while i >= 0:
+        if not (b >> i) & 1:
+            val = val if val is None else _square(val, stats)
+            i -= 1
+            continue
+        # the longest window of at most w bits from bit i, ending in a 1
+        j = max(i - w + 1, 0)
+        while not (b >> j) & 1:
+            j += 1
+        if val is not None:
+            for _ in range(i - j + 1):
+                val = _square(val, stats)
+        val = _mul(val, table[((b >> j) & ((1 << (i - j + 1)) - 1)) >> 1],
+                   stats)
+        i = j - 1
+    return val
+
+
+def wnaf_digits(b, w):
+    """the width w NAF digits of b > 0, least significant first"""
+    digits = []
+    while b:
+        if b & 1:
+            d = b & ((1 << w) - 1)
+            if d >= 1 << (w - 1):
+                d -= 1 << w
+            b -= d
+        else:
+            d = 0
+        digits.append(d)
+        b >>= 1
+    return digits
+
+
+def _wnaf(a, b, w, stats):
+    table = _odd_powers(a, 1 << (w - 2), stats)
+    inverses = [None] * len(table)
+    val = None
+    for d in reversed(wnaf_digits(b, w)):
+        if val is not None:
+            val = _square(val, stats)
+        if d > 0:
+            val = _mul(val, table[d >> 1], stats)
+        elif d < 0:
+            if inverses[-d >> 1] is None:
+                inverses[-d >> 1] = table[-d >> 1].inverse()
+                _count(stats, "inversions")
+            val = _mul(val, inverses[-d >> 1], stats)
+    return val
+
+
+def _fixed(a, b, w, stats):
+    table = [None, a]
+    for _ in range(2, 1 << w):
+        table.append(_mul(table[-1], a, stats))
+    mask = (1 << w) - 1
+    val = None
+    for shift in range(-(-b.bit_length() // w) * w - w, -1, -w):
+        if val is not None:
+            for _ in range(w):
+                val = _square(val, stats)
+        d = (b >> shift) & mask
+        if d:
+            val = _mul(val, table[d], stats)
+    return val
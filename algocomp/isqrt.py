@@ -1,4 +1,6 @@
 
+import math
+
 from .tracked_number import (coerce_int, TrackedNumber)
 
 
@@ -11,6 +13,8 @@ def isqrt(n):
     initial code from:
     https://code.activestate.com/recipes/577821-integer-square-root-function
     https://stackoverflow.com/a/1624602
+
+    plain ints use math.isqrt, which gives the same result
     """
     if n < 0:
         raise ValueError('square root not defined for negative numbers')
@@ -23,6 +27,8 @@ def isqrt(n):
     we'll count this part cost free for simplicity,
         and because it should be quick
     """
+    if isinstance(n, int):
+        return math.isqrt(n)
     if n == 0:
         return 0
     a, b = divmod(coerce_int(n).bit_length(), 2)
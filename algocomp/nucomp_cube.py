@@ -0,0 +1,157 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from .cost_tracking import (routine_tracking_start, routine_tracking_stop)
+from .tracked_number import coerce_int
+from .solve_linear import *
+from .gcd import (xgcd, gcd, partial_xgcd_lehmer)
+from .int_div import (exact_div, mod_min)
+from .bqf import reduce_form
+from .cube import *
+
+
+def construct_nucomp_cube(A1, B1, C1, A2, B2, C2, L):
+    """
+    Constructs a cube with form1 = (A1,B1,C1) and form2 = (A2,B2,C2),
+    and performs a partial reduction limited by L.
+
+    The forms must have the same discriminant.
+    Form 2 may be replaced by an equivalent form (see below), so only
+    its class is guaranteed to be kept.
+
+    ---
+    Algorithm:
+
+    Similar to construct_nudupl_cube, initially sets up the faces of the
+    cube like so:
+    |a b| = |-1 b|    |e f| = |e  f|
+    |c d|   | 0 A1| , |g h|   |A2 s|
+    where s = (B1+B2)/2, and n = B2 - s = (B2-B1)/2
+
+    This garauntees A1, A2 and (B1+B2)/2, then the remaining constraints
+        (B1-B2)/2 = bg - de  -->  b A2 - e A1 = -n
+        C1 = fg - eh         -->  f A2 - e s = C1
+        C2 = df - bh         -->  f A1 - b s = C2
+    are solvable if gcd(A1,A2,s) = 1. Then with
+        u1 A1 + u2 A2 = d = gcd(A1,A2)
+        x2 s + y2 d = 1
+    e = u1 y2 n - x2 C1 (mod A2) solves both
+        e A1 = n  (mod A2)
+        e s = -C1 (mod A2)
+    which gives b and f by exact division.
+    (the last constraint follows, as s n = A2 C2 - A1 C1 for forms of the
+    same discriminant)
+
+    If gcd(A1,A2,s) > 1, form 2 is first replaced by the equivalent form
+    under |1 0|, for k = 1,2,... until the condition holds.
+              |k 1|
+    """
+    tracking = routine_tracking_start("construct_nucomp_cube",
+                                      A1, B1, C1, A2, B2, C2)
+    cube = _construct_nucomp_cube(A1, B1, C1, A2, B2, C2, L)
+    routine_tracking_stop(tracking)
+    return cube
+
+
+def _construct_nucomp_cube(A1, B1, C1, A2, B2, C2, L):
+    # -- make sure the forms are concordant
+    d, u1, u2 = xgcd(A1, A2)
+    s = (B1+B2)//2
+    k = 0
+    while d != 1 and gcd(d, s) != 1:
+        # (A2,B2,C2) -> (A2 + B2 k + C2 k^2, B2 + 2 C2 k, C2)
+        A2 = A2 + B2 + C2
+        B2 = B2 + 2*C2
+        s = s + C2
+        k = k + 1
+        d, u1, u2 = xgcd(A1, A2)
+    n = B2 - s
+
+    # -- construct cube
+    if d == 1:
+        x2, y2 = 0, 1
+    else:
+        _, x2, y2 = xgcd(s, d)
+    e = mod_min(u1*y2*n - x2*C1, A2)
+    b = exact_div(e*A1 - n, A2)
+
+    """
+    -- now partially reduce the cube
+
+    exactly as in construct_nudupl_cube, transform with
+      |new_a new_b| = | x -z| |-1 b |
+      |new_c new_d|   |-y  w| | 0 A1|
+    where partial reducing gives
+        new_d, x, new_b, y = partial_xgcd(A1, b, L)
+    so new_a = -x, new_c = y
+
+    the other face is no longer tied to the first (b != e in general),
+    so solve for it from the linear equations the cube values must satisfy,
+    each of which has determinant new_b new_c - new_a new_d = A1
+      new_c new_e - new_a new_g = A2
+      new_b new_g - new_d new_e = -n
+    and
+      new_c new_f - new_a new_h = s
+      new_d new_f - new_b new_h = C2
+    thus:
+      new_e = (new_b A2 - new_a n)/A1
+      new_g = (new_d A2 - new_c n)/A1
+      new_f = (new_b s - new_a C2)/A1
+      new_h = (new_d s - new_c C2)/A1
+    """
+
+    new_d, x, new_b, y = partial_xgcd_lehmer(A1, b, L)
+
+    if y == 0:
+        # special case, y=0, already partially reduced to L
+        f = exact_div(C1 + e*s, A2)
+        return (-1, b, 0, A1, e, f, A2, s)
+
+    new_a = -x
+    new_c = y
+
+    new_e = exact_div(new_b*A2 - new_a*n, A1)
+    new_g = exact_div(new_d*A2 - new_c*n, A1)
+    new_f = exact_div(new_b*s - new_a*C2, A1)
+    new_h = exact_div(new_d*s - new_c*C2, A1)
+
+    return (new_a, new_b, new_c, new_d, new_e, new_f, new_g, new_h)
+
+
+def compose_with_cube(A1, B1, C1, A2, B2, C2, L, full=False):
+    """
+    composition of (A1,B1,C1) and (A2,B2,C2) using a partially reduced cube
+
+    like entry.run, builds the cube, then reads off form 3 and reduces it
+    (partially reduced, or fully reduced if full=True)
+
+    As form1 form2 form3 = 1, this returns the inverse of form 3,
+    that is (A3,-B3,C3), which is the product of the two forms.
+    """
+    tracking = routine_tracking_start("compose_with_cube",
+                                      A1, B1, C1, A2, B2, C2)
+    if A1 < A2:
+        A1,B1,C1, A2,B2,C2 = A2,B2,C2, A1,B1,C1
+    cube = construct_nucomp_cube(A1, B1, C1, A2, B2, C2, L)
+    A3, B3, C3 = cube_form3(cube)
+    form = reduce_form(A3, -B3, C3, full)
+    routine_tracking_stop(tracking)
+    return form
@@ -19,9 +19,10 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+from .cost_tracking import (routine_tracking_start, routine_tracking_stop)
 from .tracked_number import coerce_int
 from .solve_linear import *
-from .gcd import (xgcd, gcd, partial_xgcd)
+from .gcd import (xgcd, gcd, partial_xgcd, partial_xgcd_lehmer)
 from .int_div import exact_div
 from .cube import *
 
@@ -45,7 +46,13 @@ def construct_nudupl_cube(A, B, C, L):
 
     C1 = fg - eh = fA - bB = C ... solvable for f,b since gcd(A,B)=1
     """
+    tracking = routine_tracking_start("construct_nudupl_cube", A, B, C)
+    cube = _construct_nudupl_cube(A, B, C, L)
+    routine_tracking_stop(tracking)
+    return cube
 
+
+def _construct_nudupl_cube(A, B, C, L):
     # -- construct cube
     a = -1
     c = 0
@@ -118,7 +125,7 @@ def construct_nudupl_cube(A, B, C, L):
        new_h = (new_f new_d - C)/new_b
     """
 
-    new_d, x, new_b, y = partial_xgcd(A, b, L)
+    new_d, x, new_b, y = partial_xgcd_lehmer(A, b, L)
 
     if y == 0:
         # special case, y=0, already partially reduced to L
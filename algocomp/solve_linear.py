@@ -19,33 +19,47 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+from .cost_tracking import (routine_tracking_start, routine_tracking_stop)
 from .tracked_number import coerce_int as _int
-from .gcd import xgcd
+from .gcd import xgcd_mod
 from .int_div import (exact_div, mod_min)
 
+# consistency checks, off in production mode (see set_production_mode)
+CHECKS = True
+
 
 def solve_linear_x(a,b,c):
     """returns x with the minimum |x| such that a*x + b*y = c has a solution"""
+    tracking = routine_tracking_start("solve_linear_x", a, b, c)
+    x = _solve_linear_x(a,b,c)
+    routine_tracking_stop(tracking)
+    return x
+
 
+def _solve_linear_x(a,b,c):
     # Start by checking some special cases first
     if a==0:
         if b==0:
             assert c==0
             return (0,0)
-        assert (_int(c) % _int(b)) == 0   # use _int to bypass cost for assert
+        if CHECKS:
+            assert (_int(c) % _int(b)) == 0   # use _int to bypass cost for assert
         x = 0
         y = c//b
         return (x,y)
 
     if b==0:
-        assert (_int(c) % _int(a)) == 0   # use _int to bypass cost for assert
+        if CHECKS:
+            assert (_int(c) % _int(a)) == 0   # use _int to bypass cost for assert
         x = c//a
         y = 0
         return (x,y)
 
     # solve: a u + b v = g = gcd(a,b)
-    g,u,v = xgcd(a,b)
-    assert (_int(c) % _int(g))==0     # use _int to bypass cost for assert
+    # (x only depends on u mod b)
+    g,u = xgcd_mod(a,b)
+    if CHECKS:
+        assert (_int(c) % _int(g))==0     # use _int to bypass cost for assert
 
     """
     given
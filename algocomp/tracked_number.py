@@ -23,24 +23,47 @@ from .ipow import ipow
 
 
 def coerce_int(x):
-    if isinstance(x, TrackedNumber):
+    if x.__class__ is TrackedNumber:
         return x.value
     if isinstance(x, int):
         return x
+    if isinstance(x, TrackedNumber):
+        return x.value
     raise TypeError("Got type {}, expected TrackedNumber or int"
                     "".format(x.__class__.__name__))
 
 
+def is_tracked(*values):
+    """
+    True if any of the values is a TrackedNumber
+
+    routines use it to pick methods which are fast in CPython for plain
+    ints, where they differ from the ones which are cheap in the cost model
+    """
+    for x in values:
+        if isinstance(x, TrackedNumber):
+            return True
+    return False
+
+
 class TrackedNumber:
+    # -- compact representation
+    # Arithmetic on tracked numbers is the hot path of a scoring run, so
+    # avoid a per instance __dict__, and cache the bit length so the cost
+    # tracking doesn't need to recompute it for every operation using
+    # this value.
+    __slots__ = ("costTracking", "value", "bits")
+
     def __init__(self, costTracking, value=0):
         if not isinstance(value, int):
             raise TypeError("value is type {}, expected TrackedNumber or int"
                             "".format(value.__class__.__name__))
         self.costTracking = costTracking
         self.value = value
+        self.bits = value.bit_length()
 
     def copy(self):
-        return TrackedNumber(self.costTracking, self.value)
+        return _tracked(self.costTracking, self.value, self.bits)
 
 
     def _check_coerce_int(self, x):
@@ -49,6 +72,20 @@ class TrackedNumber:
                 raise ValueError("values have mismatched cost tracking")
         return coerce_int(x)
 
+    def _operand(self, x):
+        """
+        return (value, bit length) of the other operand x
+
+        the arithmetic below inlines the fast path of this for the common
+        case of x being a TrackedNumber with the same cost tracking
+        """
+        if x.__class__ is TrackedNumber:
+            if x.costTracking is not self.costTracking:
+                raise ValueError("values have mismatched cost tracking")
+            return x.value, x.bits
+        x = self._check_coerce_int(x)
+        return x, x.bit_length()
+
 
     def __str__(self):
         return str(self.value)
@@ -68,13 +105,13 @@ class TrackedNumber:
         return self.value != 0
 
     def __neg__(self):
-        return TrackedNumber(self.costTracking, -self.value)
+        return _tracked(self.costTracking, -self.value, self.bits)
 
     def __pos__(self):
-        return TrackedNumber(self.costTracking, +self.value)
+        return _tracked(self.costTracking, +self.value, self.bits)
 
     def __abs__(self):
-        return TrackedNumber(self.costTracking, abs(self.value))
+        return _tracked(self.costTracking, abs(self.value), self.bits)
 
 
     # comparisons
@@ -101,19 +138,34 @@ class TrackedNumber:
     # basic arithmetic
 
     def __add__(self, other):
-        x,y = self.value, self._check_coerce_int(other)
-        self.costTracking.add(x,y)
-        return TrackedNumber(self.costTracking, x+y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            y, ybits = other.value, other.bits
+        else:
+            y, ybits = self._operand(other)
+        ct.add_bits(self.bits, ybits)
+        z = self.value+y
+        return _tracked(ct, z, z.bit_length())
 
     def __sub__(self, other):
-        x,y = self.value, self._check_coerce_int(other)
-        self.costTracking.sub(x,y)
-        return TrackedNumber(self.costTracking, x-y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            y, ybits = other.value, other.bits
+        else:
+            y, ybits = self._operand(other)
+        ct.sub_bits(self.bits, ybits)
+        z = self.value-y
+        return _tracked(ct, z, z.bit_length())
 
     def __mul__(self, other):
-        x,y = self.value, self._check_coerce_int(other)
-        self.costTracking.mul(x,y)
-        return TrackedNumber(self.costTracking, x*y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            y, ybits = other.value, other.bits
+        else:
+            y, ybits = self._operand(other)
+        ct.mul_bits(self.bits, ybits)
+        z = self.value*y
+        return _tracked(ct, z, z.bit_length())
 
     # -- this no longer supported
     # issue:
@@ -134,36 +186,66 @@ class TrackedNumber:
     #    return TrackedNumber(self.costTracking, x//y)
 
     def __floordiv__(self, other):
-        x,y = self.value, self._check_coerce_int(other)
-        self.costTracking.div(x,y)
-        return TrackedNumber(self.costTracking, x//y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            y, ybits = other.value, other.bits
+        else:
+            y, ybits = self._operand(other)
+        ct.div_bits(self.bits, ybits)
+        z = self.value//y
+        return _tracked(ct, z, z.bit_length())
 
     def __mod__(self, other):
-        x,y = self.value, self._check_coerce_int(other)
-        self.costTracking.div(x,y)
-        return TrackedNumber(self.costTracking, x%y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            y, ybits = other.value, other.bits
+        else:
+            y, ybits = self._operand(other)
+        ct.div_bits(self.bits, ybits)
+        z = self.value%y
+        return _tracked(ct, z, z.bit_length())
 
     def __divmod__(self, other):
-        x,y = self.value, self._check_coerce_int(other)
-        self.costTracking.div(x,y)
-        return (TrackedNumber(self.costTracking, x//y),
-                TrackedNumber(self.costTracking, x%y))
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            y, ybits = other.value, other.bits
+        else:
+            y, ybits = self._operand(other)
+        ct.div_bits(self.bits, ybits)
+        q, r = divmod(self.value, y)
+        return (_tracked(ct, q, q.bit_length()),
+                _tracked(ct, r, r.bit_length()))
 
 
     def __radd__(self, other):
-        x,y = self._check_coerce_int(other), self.value
-        self.costTracking.add(x,y)
-        return TrackedNumber(self.costTracking, x+y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            x, xbits = other.value, other.bits
+        else:
+            x, xbits = self._operand(other)
+        ct.add_bits(xbits, self.bits)
+        z = x+self.value
+        return _tracked(ct, z, z.bit_length())
 
     def __rsub__(self, other):
-        x,y = self._check_coerce_int(other), self.value
-        self.costTracking.sub(x,y)
-        return TrackedNumber(self.costTracking, x-y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            x, xbits = other.value, other.bits
+        else:
+            x, xbits = self._operand(other)
+        ct.sub_bits(xbits, self.bits)
+        z = x-self.value
+        return _tracked(ct, z, z.bit_length())
 
     def __rmul__(self, other):
-        x,y = self._check_coerce_int(other), self.value
-        self.costTracking.mul(x,y)
-        return TrackedNumber(self.costTracking, x*y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            x, xbits = other.value, other.bits
+        else:
+            x, xbits = self._operand(other)
+        ct.mul_bits(xbits, self.bits)
+        z = x*self.value
+        return _tracked(ct, z, z.bit_length())
 
     # -- no longer supported
     # see notes under truediv for details
@@ -176,20 +258,53 @@ class TrackedNumber:
     #    return TrackedNumber(self.costTracking, x//y)
 
     def __rfloordiv__(self, other):
-        x,y = self._check_coerce_int(other), self.value
-        self.costTracking.div(x,y)
-        return TrackedNumber(self.costTracking, x//y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            x, xbits = other.value, other.bits
+        else:
+            x, xbits = self._operand(other)
+        ct.div_bits(xbits, self.bits)
+        z = x//self.value
+        return _tracked(ct, z, z.bit_length())
 
     def __rmod__(self, other):
-        x,y = self._check_coerce_int(other), self.value
-        self.costTracking.div(x,y)
-        return TrackedNumber(self.costTracking, x%y)
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            x, xbits = other.value, other.bits
+        else:
+            x, xbits = self._operand(other)
+        ct.div_bits(xbits, self.bits)
+        z = x%self.value
+        return _tracked(ct, z, z.bit_length())
 
     def __rdivmod__(self, other):
-        x,y = self._check_coerce_int(other), self.value
-        self.costTracking.div(x,y)
-        return (TrackedNumber(self.costTracking, x//y),
-                TrackedNumber(self.costTracking, x%y))
+        ct = self.costTracking
+        if other.__class__ is TrackedNumber and other.costTracking is ct:
+            x, xbits = other.value, other.bits
+        else:
+            x, xbits = self._operand(other)
+        ct.div_bits(xbits, self.bits)
+        q, r = divmod(x, self.value)
+        return (_tracked(ct, q, q.bit_length()),
+                _tracked(ct, r, r.bit_length()))
+
+    # shifts
+    #   only shifting a tracked number is supported, the shift amount is
+    #   expected to be a small (bit count) value
+
+    def __lshift__(self, other):
+        y = self._check_coerce_int(other)
+        ct = self.costTracking
+        ct.shift_bits(self.bits, y)
+        z = self.value<<y
+        return _tracked(ct, z, z.bit_length())
+
+    def __rshift__(self, other):
+        y = self._check_coerce_int(other)
+        ct = self.costTracking
+        ct.shift_bits(self.bits, y)
+        z = self.value>>y
+        return _tracked(ct, z, z.bit_length())
 
     # exponentiation
     #   included for completeness, but probably only need square
@@ -201,3 +316,16 @@ class TrackedNumber:
     def __rpow__(self, other):
         return ipow(other, self)
 
+
+_new_object = object.__new__
+
+def _tracked(costTracking, value, bits):
+    """
+    internal fast constructor for results of arithmetic, skipping the type
+    check in __init__ (value is known to be an int, with the given bits)
+    """
+    x = _new_object(TrackedNumber)
+    x.costTracking = costTracking
+    x.value = value
+    x.bits = bits
+    return x
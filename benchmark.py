@@ -0,0 +1,234 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Repeated squaring benchmark for the contest entry.
+
+Drives entry.setup / entry.run in a loop twice:
+  1) on plain ints, measuring wall-clock squarings per second
+  2) on CostTracking numbers, measuring the modeled cost per squaring
+
+and writes a JSON report so runs can be compared across commits.
+
+usage:
+    python benchmark.py --bits 1024 --iterations 1000 --output report.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import entry
+from algocomp import (CostTracking, TrackedNumber)
+from algocomp.tracked_number import coerce_int
+from inkfish.create_discriminant import create_discriminant
+from iteration_recorder import IterationRecorder
+
+
+DEFAULT_SEED = "Summer2020algContest"
+
+
+def git_revision():
+    """return the current git commit, or None if not available"""
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                      stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.decode().strip()
+
+
+def run_plain(discriminant, iterations, full_reduction=False):
+    """run the squarings on plain ints, return (stats, final cube)"""
+    start = time.perf_counter()
+    cube, info = entry.setup(discriminant, full_reduction)
+    setup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        cube = entry.run(cube, info)
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "setup_seconds": setup_time,
+        "seconds": elapsed,
+        "squarings_per_second": (iterations / elapsed) if elapsed else None,
+        "seconds_per_squaring": (elapsed / iterations) if iterations else None,
+    }
+    return stats, cube
+
+
+def run_tracked(discriminant, iterations, full_reduction=False, profile=False,
+                series=None, cost_model=None):
+    """
+    run the squarings on cost tracked numbers, return (stats, final cube)
+
+    with profile, stats["profile"] is the call tree of the squarings
+    with series, the cost and time of each squaring is written to that
+    file (JSONL, or CSV for a .csv file)
+    cost_model is given to CostTracking, see algocomp.get_cost_model
+    """
+    ct = CostTracking(model=cost_model)
+    cube, info = entry.setup(ct.NewNumber(discriminant), full_reduction)
+    setup_cost = ct.last()
+
+    # reset the per operation details, so they only cover the squarings
+    ct = CostTracking(profile, cost_model)
+    cube = tuple(ct.NewNumber(coerce_int(x)) for x in cube)
+    info = dict((k, ct.NewNumber(v.value) if isinstance(v, TrackedNumber)
+                 else v) for k, v in info.items())
+
+    with IterationRecorder(series, cost_tracking=ct) as recorder:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            recorder.start()
+            cube = entry.run(cube, info)
+            recorder.stop(cube)
+        elapsed = time.perf_counter() - start
+
+    percentiles = recorder.summary()
+    stats = {
+        "setup_cost": setup_cost,
+        "seconds": elapsed,
+        "total_cost": ct.cost,
+        "cost_per_squaring": (ct.cost / iterations) if iterations else None,
+        "min_cost": recorder.cost_histogram.min,
+        "max_cost": recorder.cost_histogram.max,
+        "cost_percentiles": percentiles.get("cost"),
+        "seconds_percentiles": percentiles["seconds"],
+        "operation_counts": {"add": ct.num_add, "sub": ct.num_sub,
+                             "mul": ct.num_mul, "div": ct.num_div,
+                             "shift": ct.num_shift},
+        "operation_costs": {"add": ct.cost_add, "sub": ct.cost_sub,
+                            "mul": ct.cost_mul, "div": ct.cost_div,
+                            "shift": ct.cost_shift},
+        "routine_counts": dict(ct.num_routine),
+        "routine_costs": dict(ct.cost_routine),
+    }
+    if profile:
+        stats["profile"] = ct.profile().to_dict()
+        stats["profile_folded"] = ct.profile_folded()
+    return stats, tuple(coerce_int(x) for x in cube)
+
+
+def run_benchmark(bits=1024, seed=DEFAULT_SEED, iterations=1000,
+                  tracked_iterations=None, full_reduction=False,
+                  profile=False, series=None, cost_model=None):
+    """
+    generate a discriminant from (seed, bits) and benchmark it
+
+    returns the report as a dictionary
+    """
+    if tracked_iterations is None:
+        tracked_iterations = iterations
+
+    start = time.perf_counter()
+    discriminant = create_discriminant(seed.encode(), bits)
+    discriminant_time = time.perf_counter() - start
+
+    plain, plain_cube = run_plain(discriminant, iterations, full_reduction)
+    tracked, tracked_cube = run_tracked(discriminant, tracked_iterations,
+                                        full_reduction, profile, series,
+                                        cost_model)
+
+    report = {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "bits": bits,
+        "discriminant": str(discriminant),
+        "discriminant_seconds": discriminant_time,
+        "iterations": iterations,
+        "tracked_iterations": tracked_iterations,
+        "full_reduction": full_reduction,
+        "cost_model": CostTracking(model=cost_model).model.to_dict(),
+        "plain": plain,
+        "tracked": tracked,
+    }
+    if iterations == tracked_iterations:
+        # both runs should have computed exactly the same cube
+        report["consistent"] = (plain_cube == tracked_cube)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="benchmark repeated squaring with entry.setup/entry.run")
+    parser.add_argument("--bits", type=int, default=1024,
+                        help="discriminant size in bits (512, 1024, 2048)")
+    parser.add_argument("--seed", default=DEFAULT_SEED,
+                        help="seed used to generate the discriminant")
+    parser.add_argument("-n", "--iterations", type=int, default=1000,
+                        help="number of squarings on plain ints")
+    parser.add_argument("--tracked-iterations", type=int, default=None,
+                        help="number of cost tracked squarings "
+                             "(default: same as --iterations)")
+    parser.add_argument("--full-reduction", action="store_true",
+                        help="fully reduce each form (entry.setup option)")
+    parser.add_argument("--profile", action="store_true",
+                        help="include the call tree cost profile of the "
+                             "tracked squarings in the report")
+    parser.add_argument("--folded", default=None,
+                        help="with --profile, also write the profile in "
+                             "folded stack format (for flamegraph.pl) to "
+                             "this file")
+    parser.add_argument("--series", default=None,
+                        help="write the cost and time of each tracked "
+                             "squaring to this file (JSONL, or CSV if it "
+                             "ends with .csv)")
+    parser.add_argument("--cost-model", default=None,
+                        help="cost model of the tracked run: contest "
+                             "(default), schoolbook, karatsuba, toom3, or a "
+                             "JSON file from calibrate_costs.py")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the JSON report to this file "
+                             "(default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.bits, args.seed, args.iterations,
+                           args.tracked_iterations, args.full_reduction,
+                           args.profile or args.folded is not None,
+                           args.series, args.cost_model)
+    if "profile_folded" in report["tracked"]:
+        folded = report["tracked"].pop("profile_folded")
+        if args.folded is not None:
+            with open(args.folded, "w") as f:
+                f.write(folded)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print("squarings/sec: {:.1f}  cost/squaring: {:.4e}".format(
+              report["plain"]["squarings_per_second"],
+              report["tracked"]["cost_per_squaring"]), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
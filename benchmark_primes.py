@@ -0,0 +1,113 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Micro-benchmark for inkfish.primes
+
+Times, for each size:
+  - is_probable_prime on random odd numbers (mostly composites)
+  - is_probable_prime on primes (the full BPSW test)
+  - create_discriminant
+and the odd_primes_below_n sieve used by create_discriminant.
+
+usage:
+    python benchmark_primes.py --bits 128 2048 --output primes.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmark import (DEFAULT_SEED, git_revision)
+from inkfish.create_discriminant import create_discriminant
+from inkfish.primes import (is_probable_prime, odd_primes_below_n)
+
+
+def time_per_call(f, args):
+    """return the average seconds per call of f over the list of args"""
+    start = time.perf_counter()
+    for x in args:
+        f(x)
+    return (time.perf_counter() - start) / len(args)
+
+
+def run_primes_benchmark(bits_list=(128, 2048), count=200, seed=DEFAULT_SEED):
+    """returns the report as a dictionary"""
+    rng = random.Random(seed)
+    report = {
+        "commit": git_revision(),
+        "seed": seed,
+        "count": count,
+        "sieve_seconds": time_per_call(odd_primes_below_n, [1 << 16] * 10),
+        "sizes": {},
+    }
+    for bits in bits_list:
+        odd = [rng.getrandbits(bits) | (1 << (bits-1)) | 1
+               for _ in range(count)]
+        primes = []
+        n = rng.getrandbits(bits) | (1 << (bits-1)) | 1
+        while len(primes) < max(1, count // 20):
+            if is_probable_prime(n):
+                primes.append(n)
+            n += 2
+
+        start = time.perf_counter()
+        create_discriminant(seed.encode(), bits)
+        discriminant_time = time.perf_counter() - start
+
+        report["sizes"][str(bits)] = {
+            "random_odd_seconds": time_per_call(is_probable_prime, odd),
+            "prime_seconds": time_per_call(is_probable_prime, primes),
+            "discriminant_seconds": discriminant_time,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="benchmark the inkfish.primes primality routines")
+    parser.add_argument("--bits", type=int, nargs="+", default=[128, 2048],
+                        help="sizes in bits to benchmark")
+    parser.add_argument("-n", "--count", type=int, default=200,
+                        help="number of random odd numbers per size")
+    parser.add_argument("--seed", default=DEFAULT_SEED,
+                        help="seed for the random numbers and discriminants")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the JSON report to this file "
+                             "(default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_primes_benchmark(args.bits, args.count, args.seed)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Calibrate a cost model to this host's CPython ints.
+
+Times add, sub, mul, divmod and shift on random ints across bit sizes
+(balanced and unbalanced operands), then for each of the schoolbook,
+karatsuba and toom3 models of algocomp.cost_tracking fits the overhead and
+scale of each operation, so the costs are in nanoseconds. The model
+with the smallest relative error is written as JSON, which CostTracking
+takes as its model:
+
+    python calibrate_costs.py --output host_costs.json
+    ct = CostTracking(model="host_costs.json")
+"""
+
+import argparse
+import json
+import math
+import operator
+import platform
+import random
+import sys
+import time
+
+from algocomp.cost_tracking import (COST_MODELS, OPERATIONS, PowerCostModel)
+from benchmark import (DEFAULT_SEED, git_revision)
+
+
+DEFAULT_BITS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# (name, function, bits of x and y from the size n)
+OPERATION_SHAPES = [
+    ("add", operator.add, lambda n: (n, n)),
+    ("sub", operator.sub, lambda n: (n, n)),
+    ("mul", operator.mul, lambda n: (n, n)),
+    ("mul", operator.mul, lambda n: (n, max(n // 4, 1))),
+    ("div", divmod, lambda n: (2 * n, n)),
+    ("div", divmod, lambda n: (n + n // 4, n)),
+    ("shift", operator.rshift, lambda n: (n, 7)),
+]
+
+MODEL_NAMES = ("schoolbook", "karatsuba", "toom3")
+
+
+def time_operation(f, xbits, ybits, count, rng):
+    """return the nanoseconds per call of f(x, y), for random x, y"""
+    xs = [rng.getrandbits(xbits) | (1 << (xbits - 1)) for _ in range(count)]
+    if f is operator.rshift:
+        ys = [ybits] * count
+    else:
+        ys = [rng.getrandbits(ybits) | (1 << (ybits - 1))
+              for _ in range(count)]
+    pairs = list(zip(xs, ys))
+
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for x, y in pairs:
+            f(x, y)
+        elapsed = time.perf_counter() - start
+        # the loop itself, with a call of a trivial function
+        start = time.perf_counter()
+        for x, y in pairs:
+            operator.is_(x, y)
+        elapsed -= time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return max(best, 0.0) * 1e9 / count
+
+
+def measure(bits_list=DEFAULT_BITS, count=2000, seed=DEFAULT_SEED):
+    """returns a list of (operation, xbits, ybits, nanoseconds)"""
+    rng = random.Random(seed)
+    samples = []
+    for n in bits_list:
+        for name, f, shape in OPERATION_SHAPES:
+            xbits, ybits = shape(n)
+            samples.append((name, xbits, ybits,
+                            time_operation(f, xbits, ybits, count, rng)))
+    return samples
+
+
+def fit_model(base, samples):
+    """
+    Fit the overhead and scale of each operation of the base
+    PowerCostModel to the samples, minimizing the relative error.
+
+    returns (model, relative RMS error)
+    """
+    scales = {}
+    overheads = {}
+    for op in OPERATIONS:
+        points = [(base.shape(op, xbits, ybits), t)
+                  for name, xbits, ybits, t in samples
+                  if name == op and t > 0]
+        if not points:
+            continue
+        # weighted least squares of t ~ overhead + scale * shape, with
+        # weights 1/t^2, so the fit is on the relative error
+        s00 = sum(1 / (t * t) for f, t in points)
+        s01 = sum(f / (t * t) for f, t in points)
+        s11 = sum(f * f / (t * t) for f, t in points)
+        b0 = sum(1 / t for f, t in points)
+        b1 = sum(f / t for f, t in points)
+        det = s00 * s11 - s01 * s01
+        overhead = (b0 * s11 - b1 * s01) / det if det else 0.0
+        if overhead < 0:
+            overhead = 0.0
+        scale = max((b1 - overhead * s01) / s11, 0.0) if s11 else 0.0
+        scales[op] = scale
+        overheads[op] = overhead
+
+    model = PowerCostModel("calibrated_" + base.name, base.mul_exponent,
+                           base.fast_division, scales, overheads)
+
+    errors = [(model.cost(name, xbits, ybits) - t) / t
+              for name, xbits, ybits, t in samples if t > 0]
+    error = math.sqrt(sum(e * e for e in errors) / len(errors))
+    return model, error
+
+
+def calibrate(bits_list=DEFAULT_BITS, count=2000, seed=DEFAULT_SEED):
+    """returns the report as a dictionary, with the best fitted model"""
+    samples = measure(bits_list, count, seed)
+    fits = {}
+    best = None
+    for name in MODEL_NAMES:
+        model, error = fit_model(COST_MODELS[name], samples)
+        fits[name] = {"model": model.to_dict(), "relative_rms_error": error}
+        if best is None or error < best[1]:
+            best = (model, error)
+    return {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "samples": [{"operation": name, "xbits": xbits, "ybits": ybits,
+                     "nanoseconds": t}
+                    for name, xbits, ybits, t in samples],
+        "fits": fits,
+        "model": best[0].to_dict(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="fit the CostTracking cost model to this host")
+    parser.add_argument("--bits", type=int, nargs="+",
+                        default=list(DEFAULT_BITS),
+                        help="operand sizes in bits")
+    parser.add_argument("-n", "--count", type=int, default=2000,
+                        help="number of operations timed per sample")
+    parser.add_argument("--seed", default=DEFAULT_SEED,
+                        help="seed for the random operands")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the fitted model as JSON to this file, "
+                             "for CostTracking(model=...)")
+    parser.add_argument("--report", default=None,
+                        help="write the full report (timings and all the "
+                             "fits) as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = calibrate(args.bits, args.count, args.seed)
+
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            f.write(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    text = json.dumps(report["model"], indent=2, sort_keys=True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    for name, fit in sorted(report["fits"].items()):
+        print("{}: relative rms error {:.1%}".format(
+              name, fit["relative_rms_error"]), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+On-disk cache of the per discriminant setup values.
+
+For a (seed, length) pair this stores
+  - the discriminant, from inkfish.create_discriminant
+  - L = isqrt(isqrt(-D//4))
+  - the initial cube, construct_nudupl_cube(2, 1, (1-D)//8, L)
+  - the generator form, (2, 1, (1-D)//8) reduced
+so that none of them need to be recomputed when the same pair comes up
+again.
+
+The cache is a single sqlite file, one row per (seed, length), so a lookup
+only reads and unpacks its own entry. The values are packed into a compact
+binary blob (see pack_ints), and the number of entries is bounded with least
+recently used eviction.
+
+usage:
+    with DiscriminantCache("discriminants.db") as cache:
+        entry = cache.get_or_create(b"seed", 2048)
+        cube, info = cache.setup(b"seed", 2048)
+"""
+
+from collections import namedtuple
+import sqlite3
+import struct
+
+import entry
+from algocomp import (isqrt, construct_nudupl_cube, reduce_form_full)
+from inkfish.create_discriminant import create_discriminant
+
+
+CacheEntry = namedtuple("CacheEntry", ["discriminant", "L", "cube",
+                                       "generator"])
+
+# blob layout: version, count, then for each int a byte length and the
+# signed big endian bytes
+BLOB_VERSION = 1
+_header = struct.Struct(">BH")
+_int_size = struct.Struct(">H")
+
+
+def pack_ints(values):
+    """pack a sequence of ints into the compact binary layout"""
+    parts = [_header.pack(BLOB_VERSION, len(values))]
+    for x in values:
+        data = x.to_bytes((x.bit_length() + 8) // 8, "big", signed=True)
+        parts.append(_int_size.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def unpack_ints(blob):
+    """unpack a list of ints packed by pack_ints"""
+    version, count = _header.unpack_from(blob, 0)
+    if version != BLOB_VERSION:
+        raise ValueError("unsupported cache entry version {}".format(version))
+    offset = _header.size
+    values = []
+    for _ in range(count):
+        size, = _int_size.unpack_from(blob, offset)
+        offset += _int_size.size
+        values.append(int.from_bytes(blob[offset:offset+size], "big",
+                                     signed=True))
+        offset += size
+    return values
+
+
+def compute_entry(seed, length):
+    """calculate the cache entry for (seed, length) from scratch"""
+    D = create_discriminant(seed, length)
+    L = isqrt(isqrt(-D//4))
+    cube = construct_nudupl_cube(2, 1, (1-D)//8, L)
+    generator = reduce_form_full(2, 1, (1-D)//8)[:3]
+    return CacheEntry(D, L, cube, generator)
+
+
+class DiscriminantCache:
+    def __init__(self, path, max_entries=4096):
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " seed BLOB NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " data BLOB NOT NULL,"
+            " last_used INTEGER NOT NULL,"
+            " PRIMARY KEY (seed, length))")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_used"
+            " ON entries (last_used)")
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _next_use(self):
+        return self.connection.execute(
+            "SELECT COALESCE(MAX(last_used), 0) + 1 FROM entries").fetchone()[0]
+
+    def get(self, seed, length):
+        """return the CacheEntry for (seed, length), or None if not cached"""
+        row = self.connection.execute(
+            "SELECT data FROM entries WHERE seed = ? AND length = ?",
+            (seed, length)).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute(
+                "UPDATE entries SET last_used = ? WHERE seed = ? AND length = ?",
+                (self._next_use(), seed, length))
+        values = unpack_ints(row[0])
+        return CacheEntry(values[0], values[1], tuple(values[2:10]),
+                          tuple(values[10:13]))
+
+    def put(self, seed, length, cache_entry):
+        """store the CacheEntry for (seed, length), evicting if full"""
+        D, L, cube, generator = cache_entry
+        data = pack_ints([D, L] + list(cube) + list(generator))
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (seed, length, data, self._next_use()))
+            self.connection.execute(
+                "DELETE FROM entries WHERE last_used <= ("
+                " SELECT last_used FROM entries ORDER BY last_used DESC"
+                " LIMIT 1 OFFSET ?)", (self.max_entries,))
+
+    def get_or_create(self, seed, length):
+        """return the CacheEntry for (seed, length), computing it if needed"""
+        cache_entry = self.get(seed, length)
+        if cache_entry is None:
+            cache_entry = compute_entry(seed, length)
+            self.put(seed, length, cache_entry)
+        return cache_entry
+
+    def setup(self, seed, length, full_reduction=False):
+        """entry.setup for the discriminant of (seed, length)"""
+        cache_entry = self.get_or_create(seed, length)
+        return entry.setup(cache_entry.discriminant, full_reduction,
+                           (cache_entry.L, cache_entry.cube))
@@ -24,10 +24,26 @@ SOFTWARE.
 from algocomp import *
 
 
-def setup(discriminant):
-    L = isqrt(isqrt(-discriminant//4))
-    info = {"D":discriminant, "L":L}
-    cube = construct_nudupl_cube(2, 1, (1-discriminant)//8, L)
+def setup(discriminant, full_reduction=False, precomputed=None, form=None):
+    # full_reduction: fully reduce each form before building the next cube
+    #   (instead of a single partial reduction step)
+    # precomputed: optional (L, cube) already calculated for this
+    #   discriminant, for example from discriminant_cache (plain ints only)
+    # form: optional (A, B, C) to start squaring from, instead of the
+    #   default (2, 1, (1-D)//8) (precomputed is ignored then)
+    # a plain int discriminant runs in production mode, with no routine
+    #   tracking or consistency checks (see algocomp.set_production_mode)
+    set_production_mode(isinstance(discriminant, int))
+    if precomputed is not None and form is None and \
+            isinstance(discriminant, int):
+        L, cube = precomputed
+        cube = tuple(cube)
+    else:
+        if form is None:
+            form = (2, 1, (1-discriminant)//8)
+        L = isqrt(isqrt(-discriminant//4))
+        cube = construct_nudupl_cube(*form, L)
+    info = {"D":discriminant, "L":L, "full_reduction":full_reduction}
     return (cube, info)
 
 
@@ -55,7 +71,7 @@ def run(cube, info):
     # C3 = d*g - c*h
     C3 = d*d - c*h
 
-    A, B, C = reduce_form(A3, B3, C3)
+    A, B, C = reduce_form(A3, B3, C3, info["full_reduction"])
 
     new_cube = construct_nudupl_cube(A, B, C, info["L"])
 
@@ -1,4 +1,5 @@
 from . import mod
+from algocomp import (ipow, isqrt, nudupl)
 
 
 class ClassGroup(tuple):
@@ -28,13 +29,18 @@ class ClassGroup(tuple):
     def __init__(self, a, b, c):
         super(ClassGroup, self).__init__()
         self._discriminant = None
+        # set on forms known to be reduced, so reduced() can return self
+        self._reduced = False
+
+    def __getnewargs__(self):
+        # for pickling (such as sending to a process pool)
+        return tuple(self)
 
     def __mul__(self, other):
         return self.multiply(other)
 
     def __hash__(self):
-        a, b, c = self.reduced()
-        return hash((a, b, c))
+        return tuple.__hash__(self.reduced())
 
     def identity(self):
         return self.identity_for_discriminant(self.discriminant())
@@ -46,11 +52,22 @@ class ClassGroup(tuple):
         return self._discriminant
 
     def reduced(self):
+        if self._reduced:
+            return self
         a, b, c = self.normalized()
         while a > c or (a == c and b < 0):
             s = (c + b) // (c + c)
             a, b, c = c, -b + 2 * s * c, c * s * s - b * s + a
-        return self.__class__(a, b, c).normalized()
+        return self._from_reduced(*self.__class__(a, b, c).normalized())
+
+    def _from_reduced(self, a, b, c):
+        """
+        A new element from a form already known to be reduced.
+        """
+        r = self.__class__(a, b, c)
+        r._reduced = True
+        r._discriminant = self._discriminant
+        return r
 
     def normalized(self):
         a, b, c = self
@@ -68,20 +85,81 @@ class ClassGroup(tuple):
                          for x in [r[0], r[1]]])
 
     def __eq__(self, other):
-        return tuple(self.reduced()) == tuple(ClassGroup(*other).reduced())
+        if not isinstance(other, ClassGroup):
+            other = ClassGroup(*other)
+        return tuple.__eq__(self.reduced(), other.reduced())
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __pow__(self, n):
-        x = self
-        items_prod = self.identity()
-        while n > 0:
-            if n & 1:
-                items_prod *= x
-            x = x.square()
-            n >>= 1
-        return items_prod
+        if _fixed_base_tables and n >= 0:
+            table = _fixed_base_tables.get(tuple(self.reduced()))
+            if table is not None:
+                return table.pow(n)
+        return ipow(self, n)
+
+    @classmethod
+    def multi_pow(class_, bases, exponents):
+        """
+        Simultaneous multi-exponentiation, the product of
+        base^exponent over the bases.
+
+        All the bases share a single chain of squarings. Two bases use
+        Shamir's trick, more bases use Straus' interleaved windows, or
+        Pippenger's buckets when there are enough bases for that to be
+        cheaper. Bases with a registered fixed base table use it instead.
+        """
+        pairs = []
+        fixed = None
+        for g, e in zip(bases, exponents):
+            table = (_fixed_base_tables.get(tuple(g.reduced()))
+                     if _fixed_base_tables and e else None)
+            if table is not None:
+                fixed = _mul(fixed, table.pow(e))
+                continue
+            if e < 0:
+                g, e = g.inverse(), -e
+            if e:
+                pairs.append((g, e))
+        if not pairs:
+            if fixed is not None:
+                return fixed
+            if not bases:
+                raise ValueError("multi_pow needs at least one base")
+            return bases[0].identity()
+        if len(pairs) == 1:
+            return _mul(fixed, pow(*pairs[0]))
+        if len(pairs) == 2:
+            x = _shamir(pairs)
+        else:
+            bits = [e.bit_length() for _, e in pairs]
+            w, straus_cost = _straus_window(bits)
+            c, pippenger_cost = _pippenger_window(bits)
+            if pippenger_cost < straus_cost:
+                x = _pippenger(pairs, c)
+            else:
+                x = _straus(pairs, w)
+        x = _mul(fixed, x)
+        return pairs[0][0].identity() if x is None else x
+
+    @classmethod
+    def register_fixed_base(class_, table):
+        """
+        Register a precomputed table of powers of its base (such as a
+        fixed_base.FixedBaseTable), used by __pow__ and multi_pow.
+        """
+        _fixed_base_tables[tuple(table.base.reduced())] = table
+
+    @classmethod
+    def unregister_fixed_base(class_, base):
+        _fixed_base_tables.pop(tuple(base.reduced()), None)
+
+    def fixed_base_table(self):
+        """
+        The table registered for this form, or None.
+        """
+        return _fixed_base_tables.get(tuple(self.reduced()))
 
     def inverse(self):
         a, b, c = self
@@ -134,47 +212,118 @@ class ClassGroup(tuple):
 
     def square(self):
         """
-        A rewrite of multiply for squaring.
+        Squaring with NUDUPL, using algocomp.bqf.nudupl.
         """
-        a1, b1, c1 = self.reduced()
+        a, b, c = self.reduced()
+        d = self.discriminant()
+        L = _nudupl_bounds.get(d)
+        if L is None:
+            L = _nudupl_bounds[d] = isqrt(isqrt(-d // 4))
+        return self._from_reduced(*nudupl(a, b, c, L, full=True))
 
-        g = b1
-        h = 0
 
-        w = mod.gcd(a1, g)
+# tables registered with ClassGroup.register_fixed_base, by reduced base
+_fixed_base_tables = {}
 
-        j = w
-        r = 0
-        s = a1 // w
-        t = s
-        u = g // w
+# the partial reduction bound L = |D/4|^(1/4) of nudupl, by discriminant
+_nudupl_bounds = {}
 
-        # solve these equations for k, l, m
-        """
-        k * t - l * s = h
-        k * u - m * s = c2
-        l * u - m * t = c1
-        """
 
-        """
-        solve
-        (tu)k - (hu + sc) = 0 mod st
-        k = (- hu - sc) * (tu)^-1
-        """
+# Helpers for ClassGroup.multi_pow, these use None for the identity so
+# that no compositions are done with it.
 
-        k_temp, constant_factor = mod.solve_mod(t * u, h * u + s * c1, s * t)
-        n, constant_factor_2 = mod.solve_mod(t * constant_factor, h - t * k_temp, s)
-        k = k_temp + constant_factor * n
-        m = (t * u * k - h * u - s * c1) // (s * t)
-        # assert m * s * t == t * u * k - h * u - s * c1
-        l = (t * m + c1) // u
-        # assert u * l == t * m + c1
-        # assert (t * u * k - h * u - s * c1) % (s * t) == 0
+def _mul(x, y):
+    if x is None:
+        return y
+    if y is None:
+        return x
+    return x * y
 
-        a3 = s * t - r * u
-        b3 = (j * u + m * r) - (k * t + l * s)
-        c3 = k * l - j * m
-        return self.__class__(a3, b3, c3).reduced()
+
+def _square(x, n=1):
+    if x is not None:
+        for _ in range(n):
+            x = x.square()
+    return x
+
+
+def _shamir(pairs):
+    """Shamir's trick, one bit of both exponents at a time"""
+    (g, e), (h, f) = pairs
+    table = [None, g, h, g * h]
+    x = None
+    for i in range(max(e.bit_length(), f.bit_length()) - 1, -1, -1):
+        x = _mul(_square(x), table[((e >> i) & 1) | (((f >> i) & 1) << 1)])
+    return x
+
+
+def _straus_window(bits):
+    """
+    The window size for Straus' method, and its cost in compositions,
+    for exponents of the given bit lengths.
+    """
+    best = None
+    for w in range(1, 9):
+        cost = (len(bits) * ((1 << w) - 2) + sum(-(-b // w) for b in bits) +
+                max(bits))
+        if best is None or cost < best[1]:
+            best = (w, cost)
+    return best
+
+
+def _straus(pairs, w):
+    """Straus' method, with a table of 2^w powers per base"""
+    tables = []
+    for g, _ in pairs:
+        table = [None, g]
+        for _ in range(2, 1 << w):
+            table.append(table[-1] * g)
+        tables.append(table)
+
+    bits = max(e.bit_length() for _, e in pairs)
+    mask = (1 << w) - 1
+    x = None
+    for shift in range(-(-bits // w) * w - w, -1, -w):
+        x = _square(x, w)
+        for table, (_, e) in zip(tables, pairs):
+            x = _mul(x, table[(e >> shift) & mask])
+    return x
+
+
+def _pippenger_window(bits):
+    """
+    The window size for Pippenger's method, and its cost in compositions,
+    for exponents of the given bit lengths.
+    """
+    best = None
+    for c in range(1, 17):
+        cost = (sum(-(-b // c) for b in bits) + -(-max(bits) // c) * (2 << c) +
+                max(bits))
+        if best is None or cost < best[1]:
+            best = (c, cost)
+    return best
+
+
+def _pippenger(pairs, c):
+    """Pippenger's method, with 2^c buckets per window of c bits"""
+    bits = max(e.bit_length() for _, e in pairs)
+    mask = (1 << c) - 1
+    x = None
+    for shift in range(-(-bits // c) * c - c, -1, -c):
+        x = _square(x, c)
+        buckets = [None] * (1 << c)
+        for g, e in pairs:
+            d = (e >> shift) & mask
+            if d:
+                buckets[d] = _mul(buckets[d], g)
+        # sum of d * buckets[d], as a running sum from the top bucket down
+        running = None
+        total = None
+        for d in range(mask, 0, -1):
+            running = _mul(running, buckets[d])
+            total = _mul(total, running)
+        x = _mul(x, total)
+    return x
 
 
 """
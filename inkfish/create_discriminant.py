@@ -1,14 +1,34 @@
 from hashlib import sha256
+import itertools
+import multiprocessing
+import os
 
 from .primes import is_probable_prime, odd_primes_below_n
 
 
 # incrementing by an amount with lots of prime factors to make results smoother
 # https://eprint.iacr.org/2011/481.pdf
-odd_primes_above_13 = odd_primes_below_n(1 << 16)[5:]
 m = 8 * 3 * 5 * 7 * 11 * 13
 residues = [x for x in range(7, m, 8) if all([x % y != 0 for y in (3, 5, 7, 11, 13)])]
-sieve_info = [(p, pow(m%p, p-2, p)) for p in odd_primes_above_13]
+
+# (p, m^-1 mod p) for the odd primes p above 13 and below 2^16, built on
+# first use by _get_sieve_info rather than at import, so that pool workers
+# given the table (see create_discriminants) don't build their own
+sieve_info = None
+
+sieve_size = 1 << 16  # each window covers n + m*i for 0 <= i < sieve_size
+_sieve_zeros = memoryview(bytes(sieve_size))
+
+# with a pool, candidates are tested in batches of this many per cpu
+pool_batch_per_cpu = 4
+
+
+def _get_sieve_info():
+    global sieve_info
+    if sieve_info is None:
+        odd_primes_above_13 = odd_primes_below_n(1 << 16)[5:]
+        sieve_info = [(p, pow(m%p, p-2, p)) for p in odd_primes_above_13]
+    return sieve_info
 
 
 def entropy_from_seed(seed, byte_count):
@@ -22,11 +42,14 @@ def entropy_from_seed(seed, byte_count):
     return bytes(blob[:byte_count])
 
 
-def create_discriminant(seed, length=2048):
+def create_discriminant(seed, length=2048, pool=None):
     """
     Return a discriminant of the given length using the given seed.
     Generate a probable prime p where p % 8 == 7.
     Return -p.
+
+    If a process pool is given, the candidates surviving the sieve are
+    tested on it (see _first_probable_prime), the result is the same.
     """
     extra = length % 8
     entropy = entropy_from_seed(seed, (length >> 3) + (2 if extra == 0 else 3))
@@ -35,22 +58,79 @@ def create_discriminant(seed, length=2048):
     n += residues[int.from_bytes(entropy[-2:], 'big') % len(residues)]
 
     # Find the smallest prime >= n of the form n + m*x
+    # starts[j] is the first i in the window with p | n + m*i, for the j'th
+    # prime p of sieve_info, that is i = -n / m (mod p), with q = m^-1 (mod p)
+    # moving to the next window only shifts these, so they are only
+    # computed from n once
+    info = _get_sieve_info()
+    starts = [((-n % p) * q) % p for p, q in info]
     while True:
-        # we set up "sieve" so it's "True" for known composite numbers
-        sieve = [False] * (1 << 16)  # Store m*i as i
-        for p, q in sieve_info:
-            # q = m^-1 (mod p)
-            # i = -n / m, so that m*i is -n (mod p).
-            i = ((-n % p) * q) % p
-            while i < len(sieve):
-                sieve[i] = True
-                i += p
-
-        for i, x in enumerate(sieve):
-            if not x and is_probable_prime(n + m*i):
-                return -(n + m*i)
-        n += m * (1 << 16)
+        # candidates are 1, known composites are 0
+        sieve = bytearray(b"\x01") * sieve_size  # Store m*i as i
+        for (p, q), i in zip(info, starts):
+            sieve[i::p] = _sieve_zeros[:(sieve_size - 1 - i) // p + 1]
+
+        candidates = (n + m*i for i in itertools.compress(range(sieve_size), sieve))
+        x = _first_probable_prime(candidates, pool)
+        if x is not None:
+            return -x
+        n += m * sieve_size
+        starts = [(i - sieve_size) % p for (p, q), i in zip(info, starts)]
+
+
+def _first_probable_prime(candidates, pool=None):
+    """
+    Return the first probable prime of the candidates, or None.
+
+    With a pool (anything with an ordered map, such as multiprocessing.Pool
+    or a concurrent.futures executor) the candidates are tested in batches
+    in parallel, and the first prime in order is still the one returned.
+    """
+    if pool is None:
+        for x in candidates:
+            if is_probable_prime(x):
+                return x
+        return None
+
+    batch_size = (os.cpu_count() or 1) * pool_batch_per_cpu
+    while True:
+        batch = list(itertools.islice(candidates, batch_size))
+        if not batch:
+            return None
+        for x, prime in zip(batch, pool.map(is_probable_prime, batch)):
+            if prime:
+                return x
+
+
+def create_discriminants(seeds, length=2048, processes=None, chunksize=1):
+    """
+    Create a discriminant for each of the seeds, see create_discriminant.
+
+    The seeds are spread over a pool of worker processes (processes=None
+    uses one per cpu), and (seed, discriminant) pairs are yielded in
+    completion order, as soon as each one is found.
+
+    The workers use this process's sieve_info table, which is passed to
+    each worker once when it starts, instead of each building it (forked
+    workers inherit it anyway, this saves the time with the spawn and
+    forkserver start methods).
+    """
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(_get_sieve_info(),)) as pool:
+        tasks = ((seed, length) for seed in seeds)
+        for result in pool.imap_unordered(_create_discriminant_task, tasks,
+                                          chunksize):
+            yield result
+
+
+def _init_worker(info):
+    global sieve_info
+    sieve_info = info
+
 
+def _create_discriminant_task(task):
+    seed, length = task
+    return (seed, create_discriminant(seed, length))
 
 """
 Copyright 2018 Chia Network Inc
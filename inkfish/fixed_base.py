@@ -0,0 +1,151 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import struct
+
+from .classgroup import ClassGroup
+
+
+DEFAULT_WINDOW_BITS = 4
+
+# header of the serialized table: window bits, number of windows, and the
+# length in bytes of the discriminant which follows it
+_header = struct.Struct(">HHH")
+
+
+class FixedBaseTable:
+    """
+    Precomputed powers of a fixed base g, for exponents of up to
+    window_bits * windows bits.
+
+    entries[i][d - 1] = g^(d * 2^(window_bits * i)), for 0 < d < 2^window_bits,
+    so g^n is the product of entries[i][digit i of n], with no squarings
+    and one composition per nonzero window of n.
+    """
+
+    def __init__(self, base, bits, window_bits=DEFAULT_WINDOW_BITS):
+        """
+        Build the table for exponents of up to bits bits.
+        """
+        base = base.reduced()
+        self.base = base
+        self.window_bits = window_bits
+        self.entries = []
+        x = base
+        for _ in range(-(-bits // window_bits)):
+            row = [x]
+            for _ in range(2, 1 << window_bits):
+                row.append(row[-1] * x)
+            self.entries.append(row)
+            for _ in range(window_bits):
+                x = x.square()
+        # g^(2^self.bits), for the part of larger exponents above the table
+        self.top = x
+
+    @property
+    def bits(self):
+        return self.window_bits * len(self.entries)
+
+    def discriminant(self):
+        return self.base.discriminant()
+
+    def pow(self, n):
+        """
+        Return base^n.
+        """
+        if n < 0:
+            return self.pow(-n).inverse()
+        x = None
+        mask = (1 << self.window_bits) - 1
+        for row in self.entries:
+            if n == 0:
+                break
+            d = n & mask
+            if d:
+                x = row[d - 1] if x is None else x * row[d - 1]
+            n >>= self.window_bits
+        if n:
+            high = pow(self.top, n)
+            x = high if x is None else x * high
+        return self.base.identity() if x is None else x
+
+    def register(self):
+        """
+        Register this table, so that ClassGroup.__pow__ and
+        ClassGroup.multi_pow use it for its base.
+        """
+        ClassGroup.register_fixed_base(self)
+        return self
+
+    def serialize(self):
+        d = self.discriminant()
+        d_bytes = d.to_bytes((d.bit_length() + 8) >> 3, "big", signed=True)
+        parts = [_header.pack(self.window_bits, len(self.entries),
+                              len(d_bytes)), d_bytes]
+        for row in self.entries:
+            parts.extend(x.serialize() for x in row)
+        parts.append(self.top.serialize())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(class_, data):
+        window_bits, windows, d_length = _header.unpack_from(data)
+        offset = _header.size
+        d = int.from_bytes(data[offset:offset + d_length], "big", signed=True)
+        offset += d_length
+        form_size = 2 * ((d.bit_length() + 16) >> 4)
+
+        forms = []
+        for _ in range(windows * ((1 << window_bits) - 1) + 1):
+            forms.append(ClassGroup.from_bytes(
+                data[offset:offset + form_size], d).reduced())
+            offset += form_size
+        if offset != len(data):
+            raise ValueError("fixed base table has {} extra bytes"
+                             "".format(len(data) - offset))
+
+        table = class_.__new__(class_)
+        table.base = forms[0]
+        table.window_bits = window_bits
+        row_size = (1 << window_bits) - 1
+        table.entries = [forms[i:i + row_size]
+                         for i in range(0, len(forms) - 1, row_size)]
+        table.top = forms[-1]
+        return table
+
+    def save(self, path):
+        """
+        Atomically write the table to a file.
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.serialize())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(class_, path):
+        with open(path, "rb") as f:
+            return class_.from_bytes(f.read())
+
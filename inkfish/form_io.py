@@ -0,0 +1,271 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Fixed width binary records of forms and cubes.
+
+A file is a header followed by records of the same size, so record i is
+at a known offset and can be read without reading the rest of the file.
+
+header:
+  magic b"IKFR", version, kind, int size in bytes, discriminant length
+  in bytes, then the discriminant (signed, big endian)
+records:
+  FORM: a, b of a reduced form (the same bytes as ClassGroup.serialize),
+        c follows from the discriminant
+  CUBE: the 8 entries of a cube (a, b, c, d, e, f, g, h)
+each int is signed, big endian, in the int size of the header.
+"""
+
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+
+from .classgroup import ClassGroup
+
+
+MAGIC = b"IKFR"
+VERSION = 1
+
+FORM = 0
+CUBE = 1
+_ints_per_record = {FORM: 2, CUBE: 8}
+
+_header = struct.Struct(">4sBBHH")
+
+# records are buffered and written to the file in blocks of about this size
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def default_int_size(kind, discriminant):
+    """
+    The int size of records of this kind, for the discriminant.
+
+    Reduced forms have |a|, |b| < sqrt(|D|), the same size as
+    ClassGroup.serialize uses, while the entries of a cube get close
+    to the size of the discriminant.
+    """
+    if kind == FORM:
+        return (discriminant.bit_length() + 16) >> 4
+    if kind == CUBE:
+        return (discriminant.bit_length() + 16) >> 3
+    raise ValueError("unknown record kind {}".format(kind))
+
+
+def _pack_header(kind, int_size, discriminant):
+    d_bytes = discriminant.to_bytes((discriminant.bit_length() + 8) >> 3,
+                                    "big", signed=True)
+    return _header.pack(MAGIC, VERSION, kind, int_size,
+                        len(d_bytes)) + d_bytes
+
+
+def _unpack_header(buffer):
+    """return (kind, int size, discriminant, header size)"""
+    if len(buffer) < _header.size:
+        raise ValueError("truncated record file header")
+    magic, version, kind, int_size, d_length = _header.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("not a record file")
+    if version != VERSION:
+        raise ValueError("unsupported record file version {}".format(version))
+    if kind not in _ints_per_record:
+        raise ValueError("unknown record kind {}".format(kind))
+    end = _header.size + d_length
+    discriminant = int.from_bytes(buffer[_header.size:end], "big",
+                                  signed=True)
+    return kind, int_size, discriminant, end
+
+
+class RecordWriter:
+    """
+    Appends form or cube records to a file, in blocks.
+
+    A new file gets a header, an existing file must have been written
+    for the same kind, int size and discriminant. A partly written record
+    at the end of an existing file (from a writer that was interrupted) is
+    dropped, so the new records start at a record boundary.
+    """
+
+    def __init__(self, path, kind, discriminant, int_size=None):
+        if int_size is None:
+            int_size = default_int_size(kind, discriminant)
+        self.kind = kind
+        self.int_size = int_size
+        self.discriminant = discriminant
+        self.record_size = _ints_per_record[kind] * int_size
+        header = _pack_header(kind, int_size, discriminant)
+
+        try:
+            self._file = open(path, "r+b")
+        except FileNotFoundError:
+            self._file = open(path, "w+b")
+        existing = self._file.read(len(header))
+        if not existing:
+            self._file.write(header)
+        else:
+            if existing != header:
+                self._file.close()
+                raise ValueError("{} has records of a different kind, int "
+                                 "size or discriminant".format(path))
+            size = self._file.seek(0, os.SEEK_END)
+            records = (size - len(header)) // self.record_size
+            self._file.truncate(len(header) + records * self.record_size)
+            self._file.seek(0, os.SEEK_END)
+        self._buffer = bytearray()
+
+    def append(self, record):
+        """
+        Append a form (ClassGroup or (a, b, c)) or a cube (8-tuple).
+        """
+        if self.kind == FORM:
+            if not isinstance(record, ClassGroup):
+                record = ClassGroup(*record)
+            record = record.reduced()[:2]
+        elif len(record) != 8:
+            raise ValueError("a cube has 8 entries, got {}".format(len(record)))
+        # encode the whole record first, an entry too large for int_size
+        # raises OverflowError before any of it is buffered
+        data = b"".join(x.to_bytes(self.int_size, "big", signed=True)
+                        for x in record)
+        self._buffer += data
+        if len(self._buffer) >= WRITE_BUFFER_SIZE:
+            self.flush()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RecordReader(Sequence):
+    """
+    Random access to the records of a buffer or file, decoded when they are
+    read, a file is memory mapped rather than read in.
+
+    Forms are returned as reduced ClassGroup elements, cubes as 8-tuples.
+    """
+
+    def __init__(self, buffer):
+        self._mmap = None
+        self._view = memoryview(buffer)
+        (self.kind, self.int_size, self.discriminant,
+         self._offset) = _unpack_header(self._view)
+        self._ints = _ints_per_record[self.kind]
+        self.record_size = self._ints * self.int_size
+        data_size = len(self._view) - self._offset
+        # ignore a partly written record at the end
+        self._count = data_size // self.record_size
+        if self.kind == FORM:
+            self._identity = ClassGroup.identity_for_discriminant(
+                self.discriminant)
+
+    @classmethod
+    def open(class_, path):
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        reader = class_(mapped)
+        reader._mmap = mapped
+        return reader
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("record index out of range")
+        size = self.int_size
+        start = self._offset + i * self.record_size
+        view = self._view
+        ints = [int.from_bytes(view[p:p + size], "big", signed=True)
+                for p in range(start, start + self.record_size, size)]
+        if self.kind == FORM:
+            a, b = ints
+            c = (b * b - self.discriminant) // (4 * a)
+            return self._identity._from_reduced(a, b, c)
+        return tuple(ints)
+
+    def close(self):
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RecordMapping(Mapping):
+    """
+    A read only mapping from keys to the records of a reader, for example
+    the powers of x used by proof_pietrzak.generate_proof, where the
+    record i is the power keys[i].
+    """
+
+    def __init__(self, reader, keys):
+        keys = list(keys)
+        if len(keys) != len(reader):
+            raise ValueError("{} keys for {} records"
+                             "".format(len(keys), len(reader)))
+        self.reader = reader
+        self._index = dict((k, i) for i, k in enumerate(keys))
+
+    def __getitem__(self, key):
+        return self.reader[self._index[key]]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+def write_records(path, kind, discriminant, records, int_size=None):
+    """
+    Append all the records to the file at path.
+    """
+    with RecordWriter(path, kind, discriminant, int_size) as writer:
+        writer.extend(records)
+
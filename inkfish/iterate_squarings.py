@@ -1,3 +1,9 @@
+import json
+import os
+
+from .classgroup import ClassGroup
+
+
 def iterate_squarings(x, powers_to_calculate):
     """
     Repeatedly square x.
@@ -19,6 +25,121 @@ def iterate_squarings(x, powers_to_calculate):
     return powers_calculated
 
 
+
+def iterate_squarings_stream(x, powers_to_calculate, engine="classgroup",
+                             checkpoint_path=None,
+                             checkpoint_interval=1 << 16):
+    """
+    Repeatedly square x, as iterate_squarings, but as a generator.
+
+    Yields (power, x^(2^power)) for each of the "powers_to_calculate" as
+    soon as it is reached, in increasing order.
+
+    engine selects the squaring step:
+      "classgroup": ClassGroup.square
+      "cube": the entry.run cube engine
+    Both give the same (reduced) results.
+
+    If checkpoint_path is given, the iteration count and current form are
+    written there every checkpoint_interval squarings (and at the end).
+    If that file already exists, the squaring resumes from it instead of
+    from x. Powers below the checkpointed iteration count are not yielded
+    again.
+    """
+    powers_to_calculate = sorted(powers_to_calculate)
+    x = ClassGroup(*x).reduced()
+
+    iteration = 0
+    current = x
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        iteration, current = read_checkpoint(checkpoint_path, x)
+
+    if engine == "classgroup":
+        step = _classgroup_steps(current)
+    elif engine == "cube":
+        step = _cube_steps(current)
+    else:
+        raise ValueError("unknown squaring engine {!r}".format(engine))
+
+    next_checkpoint = iteration + checkpoint_interval
+    for power in powers_to_calculate:
+        if power < iteration:
+            continue
+        while iteration < power:
+            n = min(power, next_checkpoint) - iteration
+            current = step(n)
+            iteration += n
+            if checkpoint_path is not None and iteration == next_checkpoint:
+                write_checkpoint(checkpoint_path, x, iteration, current)
+                next_checkpoint += checkpoint_interval
+        yield power, current
+
+    if checkpoint_path is not None:
+        write_checkpoint(checkpoint_path, x, iteration, current)
+
+
+def _classgroup_steps(current):
+    """return step(n): square the current form n times, return the result"""
+    def step(n):
+        nonlocal current
+        for _ in range(n):
+            current = current.square()
+        return current
+    return step
+
+
+def _cube_steps(current):
+    """
+    return step(n): like _classgroup_steps, using entry.run
+
+    Each entry.run turns a cube with form 1 = f into one with form 1 =
+    f^-2, so after an odd number of steps the inverse is returned.
+    """
+    import entry
+    from algocomp import cube_form1
+
+    cube, info = entry.setup(current.discriminant(), form=tuple(current))
+    parity = 0
+
+    def step(n):
+        nonlocal cube, parity
+        for _ in range(n):
+            cube = entry.run(cube, info)
+        parity ^= n & 1
+        f = ClassGroup(*cube_form1(cube)).reduced()
+        return f.inverse().reduced() if parity else f
+    return step
+
+
+def write_checkpoint(path, x, iteration, current):
+    """
+    Atomically write a checkpoint of the iteration count and current form,
+    for the squaring of x.
+    """
+    data = {
+        "x": [x[0], x[1], x[2]],
+        "iteration": iteration,
+        "form": [current[0], current[1], current[2]],
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def read_checkpoint(path, x):
+    """
+    Return (iteration, form) from a checkpoint written by write_checkpoint,
+    checking that it is for the squaring of x.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if tuple(data["x"]) != tuple(x):
+        raise ValueError("checkpoint {} is for a different x".format(path))
+    return data["iteration"], ClassGroup(*data["form"]).reduced()
+
 """
 Copyright 2018 Chia Network Inc
 
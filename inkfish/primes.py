@@ -0,0 +1,166 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import itertools
+import math
+
+
+def odd_primes_below_n(n):
+    """
+    Return a list of the odd primes less than n, in increasing order.
+
+    Sieve of Eratosthenes over the odd numbers only, index i is 2i+1,
+    with the composites crossed off by bytearray slice assignment.
+    """
+    half = n // 2
+    if half <= 1:
+        return []
+    sieve = bytearray([1]) * half
+    sieve[0] = 0
+    for i in range(1, (math.isqrt(n - 1) - 1) // 2 + 1):
+        if sieve[i]:
+            p = 2 * i + 1
+            start = p * p // 2
+            sieve[start::p] = bytes(len(range(start, half, p)))
+    return [2 * i + 1 for i in itertools.compress(range(half), sieve)]
+
+
+# small primes for trial division, which is done with a single gcd against
+# their product rather than a division per prime
+# for large n, the Miller-Rabin test is expensive enough that a second gcd
+# with the product of the primes up to LARGE_TRIAL_DIVISION_LIMIT pays off
+TRIAL_DIVISION_LIMIT = 1 << 10
+LARGE_TRIAL_DIVISION_LIMIT = 1 << 14
+LARGE_TRIAL_DIVISION_BITS = 512
+small_odd_primes = odd_primes_below_n(TRIAL_DIVISION_LIMIT)
+small_odd_primes_set = frozenset(small_odd_primes)
+small_odd_primes_product = math.prod(small_odd_primes)
+large_odd_primes_product = math.prod(
+    odd_primes_below_n(LARGE_TRIAL_DIVISION_LIMIT)[len(small_odd_primes):])
+
+
+def jacobi_symbol(a, n):
+    """
+    Return the Jacobi symbol (a/n), for odd n > 0.
+    """
+    a %= n
+    result = 1
+    while a != 0:
+        while a & 1 == 0:
+            a >>= 1
+            if n & 7 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a & 3 == 3 and n & 3 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def is_strong_probable_prime(n, base):
+    """
+    Strong (Miller-Rabin) probable prime test of odd n > 2 to the given base.
+    """
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    x = pow(base, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+def is_strong_lucas_probable_prime(n):
+    """
+    Strong Lucas probable prime test of odd n > 2, not a perfect square,
+    with the parameters of Selfridge's method A:
+    D is the first of 5, -7, 9, -11, ... with (D/n) = -1, P = 1, Q = (1-D)/4.
+    """
+    D = 5
+    while True:
+        j = jacobi_symbol(D, n)
+        if j == -1:
+            break
+        if j == 0 and abs(D) != n:
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+    Q = (1 - D) // 4
+
+    # n + 1 = d 2^s
+    d = n + 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+
+    # compute U_d, V_d, Q^d (mod n), from the most significant bit of d
+    #   U_2k = U_k V_k,  V_2k = V_k^2 - 2 Q^k
+    #   U_k+1 = (U_k + V_k)/2,  V_k+1 = (D U_k + V_k)/2
+    U, V, Qk = 1, 1, Q % n
+    for bit in bin(d)[3:]:
+        U, V, Qk = U * V % n, (V * V - 2 * Qk) % n, Qk * Qk % n
+        if bit == "1":
+            U, V = U + V, D * U + V
+            if U & 1:
+                U += n
+            if V & 1:
+                V += n
+            U, V, Qk = (U >> 1) % n, (V >> 1) % n, Qk * Q % n
+
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V, Qk = (V * V - 2 * Qk) % n, Qk * Qk % n
+        if V == 0:
+            return True
+    return False
+
+
+def is_probable_prime(n):
+    """
+    Baillie-PSW probable prime test.
+
+    Small primes are handled by trial division (a gcd with the product of
+    the odd primes below TRIAL_DIVISION_LIMIT, and for large n also up to
+    LARGE_TRIAL_DIVISION_LIMIT), then a strong base 2
+    Miller-Rabin test and a strong Lucas test are done.
+    There are no known BPSW pseudoprimes.
+    """
+    if n < TRIAL_DIVISION_LIMIT:
+        return n == 2 or n in small_odd_primes_set
+    if n & 1 == 0:
+        return False
+    if math.gcd(n, small_odd_primes_product) != 1:
+        return False
+    if n < TRIAL_DIVISION_LIMIT * TRIAL_DIVISION_LIMIT:
+        return True
+    if (n.bit_length() >= LARGE_TRIAL_DIVISION_BITS and
+            math.gcd(n, large_odd_primes_product) != 1):
+        return False
+    if not is_strong_probable_prime(n, 2):
+        return False
+    if math.isqrt(n) ** 2 == n:
+        return False
+    return is_strong_lucas_probable_prime(n)
+
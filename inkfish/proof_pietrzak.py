@@ -1,4 +1,5 @@
 import math
+import os
 
 
 def approximate_i(T):
@@ -53,11 +54,23 @@ def calculate_final_T(T, delta):
     return Ts[-delta]  # return the correct T to look for
 
 
+def _product_of_powers(identity, terms):
+    """Return the product of base^exponent over the (base, exponent) terms"""
+    if not terms:
+        return identity
+    bases, exponents = zip(*terms)
+    return identity.multi_pow(bases, exponents)
+
+
 def generate_proof(x, T, delta, y, powers, identity,
-                   generate_r_value, int_size_bits):
+                   generate_r_value, int_size_bits, pool=None):
     """
     Generate the proof.
     Returns a list of elements derived by operations on x.
+
+    If a multiprocessing pool is given, the independent terms of mu in the
+    cached rounds are computed on it, and the x_p, y_p updates run on it
+    while the next round is computed. The proof is the same.
     """
     # Only even values work, since we need to do T/2
     if T % 2 != 0:
@@ -74,6 +87,7 @@ def generate_proof(x, T, delta, y, powers, identity,
     final_T = calculate_final_T(T, delta)
 
     round_index = 0
+    pending = None  # x_p, y_p update running on the pool
     while curr_T != final_T:
         assert(curr_T & 1 == 0)
         half_T = curr_T >> 1
@@ -83,6 +97,7 @@ def generate_proof(x, T, delta, y, powers, identity,
         # use cache for first i rounds for fast computation
         if (round_index < i):
             mu = identity  # Compute product below
+            terms = []  # (mu_component, r_prod) for each cached term
 
             # Get each of the cached terms, for round 3, denominator is 8.
             # The terms are T/8, 3T/8 5T/8 7T/8. If not a power of two, we
@@ -116,10 +131,27 @@ def generate_proof(x, T, delta, y, powers, identity,
 
                 mu_component = powers[T_sum]
 
-                mu = mu * pow(mu_component, r_prod)
+                terms.append((mu_component, r_prod))
+
+            if pool is None:
+                mu = _product_of_powers(mu, terms)
+            else:
+                # split the terms into a few chunks per process of the
+                # pool, the chunk products are reduced forms, so the order
+                # doesn't matter
+                processes = (getattr(pool, "_processes", None)
+                             or os.cpu_count() or 1)
+                chunk_count = min(len(terms), 4 * processes)
+                chunks = [terms[k::chunk_count] for k in range(chunk_count)]
+                for product in pool.starmap(_product_of_powers,
+                                            [(identity, c) for c in chunks]):
+                    mu = mu * product
             mus.append(mu)
         else:
             # Compute for rounds i + 1 until the end, for low cache storage
+            if pending is not None:
+                x_p, y_p = _finish_update(pending, x_p, y_p)
+                pending = None
             mu = x_p[-1]
             for _ in range(half_T):
                 mu = pow(mu, 2)
@@ -127,21 +159,45 @@ def generate_proof(x, T, delta, y, powers, identity,
             mus.append(mu)
 
         rs.append(generate_r_value(x, y, mus[-1], int_size_bits))
-        x_p.append(pow(x_p[-1], rs[-1]) * mu)
-        y_p.append(pow(mu, rs[-1]) * y_p[-1])
 
         # Compute the new T, and y. If T is odd, make it even, and adjust
         # the y_p accordingly, so that y_p = x_p ^ (2 ^ curr_T)
         curr_T = curr_T >> 1
-        if curr_T & 1 == 1:
+        odd = curr_T & 1 == 1
+        if odd:
             curr_T += 1
-            y_p[-1] = pow(y_p[-1], 2)
+
+        if pool is None:
+            x_p.append(pow(x_p[-1], rs[-1]) * mu)
+            y_p.append(pow(mu, rs[-1]) * y_p[-1])
+            if odd:
+                y_p[-1] = pow(y_p[-1], 2)
+        else:
+            # the next round doesn't need these unless it is uncached,
+            # so let them run on the pool meanwhile
+            if pending is not None:
+                x_p, y_p = _finish_update(pending, x_p, y_p)
+            pending = (pool.apply_async(pow, (x_p[-1], rs[-1])),
+                       pool.apply_async(pow, (mu, rs[-1])), mu, odd)
         round_index += 1
 
+    if pending is not None:
+        x_p, y_p = _finish_update(pending, x_p, y_p)
+
     assert(pow(y_p[-1], 1) == pow(x_p[-1], 1 << final_T))
     return mus
 
 
+def _finish_update(pending, x_p, y_p):
+    """Complete an x_p, y_p update started on the pool by generate_proof"""
+    x_power, mu_power, mu, odd = pending
+    x_p.append(x_power.get() * mu)
+    y_p.append(mu_power.get() * y_p[-1])
+    if odd:
+        y_p[-1] = pow(y_p[-1], 2)
+    return x_p, y_p
+
+
 def verify_proof(x_initial, y_initial, proof, T, delta,
                  generate_r_value, int_size_bits):
     # Only even values work, since we need to do T/2
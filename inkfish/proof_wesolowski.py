@@ -1,5 +1,7 @@
 import hashlib
 import math
+import os
+import secrets
 
 from .primes import is_probable_prime
 
@@ -50,37 +52,84 @@ def get_block(i, k, T, B):
     return (pow(2, k) * pow(2, T - k * (i + 1), B)) // B
 
 
-def eval_optimized(identity, h, B, T, k, l, C):
+def _eval_digits(identity, j, i_start, i_stop, B, T, k, l, Cs):
     """
-    Optimized evalutation of h ^ (2^T // B)
+    The part of eval_optimized for the blocks i*l + j, i_start <= i < i_stop,
+    where Cs[i - i_start] = C[i * k * l].
+
+    Returns the product of ys[b]^b over the buckets ys, where ys[b] is the
+    product of the C values with block b.
     """
     k1 = k//2
     k0 = k - k1
-    x = identity
 
-    for j in range(l-1, -1, -1):
-        x = pow(x, pow(2, k))
-        ys = {}
-        b_limit = pow(2, k)
-        for b in range(0, b_limit):
-            ys[b] = identity
-        for i in range(0, math.ceil((T)/(k*l))):
-            if (T - k * (i*l + j + 1) < 0):
-                continue
-            b = get_block(i*l + j, k, T, B)
-            ys[b] = ys[b] * C[i * k * l]
+    # only blocks with T - k * (i*l + j + 1) >= 0 exist
+    i_stop = min(i_stop, (T // k - j - 1) // l + 1)
+    if i_stop <= i_start:
+        return identity
+
+    # get_block(i*l + j) is 2^k * (2^(T - k*(i*l + j + 1)) mod B) // B,
+    # going down in i, the exponent grows by k*l each block
+    ys = [None] * (1 << k)
+    step = pow(2, k * l, B)
+    r = pow(2, T - k * ((i_stop - 1)*l + j + 1), B)
+    for i in range(i_stop - 1, i_start - 1, -1):
+        b = (r << k) // B
+        y = ys[b]
+        ys[b] = Cs[i - i_start] if y is None else y * Cs[i - i_start]
+        r = r * step % B
 
+    x = identity
+    for b1 in range(0, pow(2, k1)):
+        z = identity
+        for b0 in range(0, pow(2, k0)):
+            y = ys[b1 * pow(2, k0) + b0]
+            if y is not None:
+                z *= y
+        x *= pow(z, b1 * pow(2, k0))
+
+    for b0 in range(0, pow(2, k0)):
+        z = identity
         for b1 in range(0, pow(2, k1)):
-            z = identity
-            for b0 in range(0, pow(2, k0)):
-                z *= ys[b1 * pow(2, k0) + b0]
-            x *= pow(z, b1 * pow(2, k0))
+            y = ys[b1 * pow(2, k0) + b0]
+            if y is not None:
+                z *= y
+        x *= pow(z, b0)
+    return x
 
-        for b0 in range(0, pow(2, k0)):
-            z = identity
-            for b1 in range(0, pow(2, k1)):
-                z *= ys[b1 * pow(2, k0) + b0]
-            x *= pow(z, b0)
+
+def eval_optimized(identity, h, B, T, k, l, C, pool=None):
+    """
+    Optimized evalutation of h ^ (2^T // B)
+
+    With a multiprocessing pool, the work for each j is split by blocks into
+    tasks run on the pool, and the partial results are combined.
+    """
+    block_count = math.ceil((T)/(k*l))
+
+    if pool is None:
+        Cs = [C[i * k * l] for i in range(block_count)]
+        parts = [_eval_digits(identity, j, 0, block_count, B, T, k, l, Cs)
+                 for j in range(l)]
+    else:
+        # a few tasks per process of the pool, however many j there are
+        processes = getattr(pool, "_processes", None) or os.cpu_count() or 1
+        split = max(1, math.ceil(4 * processes / l))
+        size = math.ceil(block_count / split)
+        tasks = []
+        for j in range(l):
+            for i_start in range(0, block_count, size):
+                i_stop = min(i_start + size, block_count)
+                Cs = [C[i * k * l] for i in range(i_start, i_stop)]
+                tasks.append((identity, j, i_start, i_stop, B, T, k, l, Cs))
+        parts = [identity] * l
+        for task, x in zip(tasks, pool.starmap(_eval_digits, tasks)):
+            parts[task[1]] = parts[task[1]] * x
+
+    x = identity
+    for j in range(l-1, -1, -1):
+        x = pow(x, pow(2, k))
+        x = x * parts[j]
     return x
 
 
@@ -104,8 +153,70 @@ def verify_proof(x, y, proof, T):
     Verification from Wesolowski paper
     """
     B = hash_prime(x.serialize() + y.serialize())
-    r = pow(2, T, B)
-    return pow(proof, B) * pow(x, r) == y
+    return _verify_with_prime(x, y, proof, T, B)
+
+
+def _verify_with_prime(x, y, proof, T, B):
+    return x.multi_pow([proof, x], [B, pow(2, T, B)]) == y
+
+
+# bits of the random exponents used by verify_proofs (see its docstring
+# for what they do and don't guarantee)
+BATCH_EXPONENT_BITS = 64
+
+
+def verify_proofs(proofs, pool=None, exponent_bits=BATCH_EXPONENT_BITS):
+    """
+    Batch verification of a sequence of (x, y, proof, T) tuples.
+
+    Returns a list with the result of verify_proof for each tuple.
+
+    With random e_i, the proofs are checked together as
+      prod (proof_i^B_i * x_i^r_i * y_i^-1)^e_i == 1
+    in a single ClassGroup.multi_pow, for each discriminant. If that
+    fails, each proof of the batch is checked on its own to find the bad
+    ones. The hash_prime values are computed on the pool if one is given.
+
+    This is weaker than verify_proof. If a bad tuple has
+    g_i = proof_i^B_i * x_i^r_i * y_i^-1 != 1, the batch still passes
+    when the e_i happen to cancel the g_i. That has probability about
+    2^-exponent_bits only if the g_i have no small order, the low order
+    assumption. If g_i has a small order q, for example y_i multiplied
+    by an element of order q, it is cancelled whenever q divides e_i, so
+    the batch passes with probability about 1/q. Class groups of prime
+    discriminants have odd order, but can have elements of order 3, 5,
+    and so on, so use verify_proof where such proofs must be rejected.
+    """
+    proofs = list(proofs)
+    inputs = [x.serialize() + y.serialize() for x, y, _, _ in proofs]
+    if pool is None:
+        Bs = [hash_prime(s) for s in inputs]
+    else:
+        Bs = pool.map(hash_prime, inputs)
+
+    batches = {}
+    for i, (x, _, _, _) in enumerate(proofs):
+        batches.setdefault(x.discriminant(), []).append(i)
+
+    results = [False] * len(proofs)
+    for indices in batches.values():
+        if len(indices) > 1:
+            bases = []
+            exponents = []
+            for i in indices:
+                x, y, proof, T = proofs[i]
+                B = Bs[i]
+                e = 1 + secrets.randbits(exponent_bits)
+                bases += [proof, x, y]
+                exponents += [e * B, e * pow(2, T, B), -e]
+            x = proofs[indices[0]][0]
+            if x.multi_pow(bases, exponents) == x.identity():
+                for i in indices:
+                    results[i] = True
+                continue
+        for i in indices:
+            results[i] = _verify_with_prime(*proofs[i], Bs[i])
+    return results
 
 
 """
@@ -0,0 +1,224 @@
+"""
+Copyright (c) 2020 jcollinscastro
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Per iteration time series of the squarings.
+
+IterationRecorder records the cost, wall time and operand sizes of each
+entry.run iteration, writes them as they come to a JSONL or CSV file, and
+keeps bounded histograms for the percentiles, so rare slow paths show up
+as outliers without keeping every value in memory.
+
+usage:
+    ct = CostTracking()
+    cube, info = entry.setup(ct.NewNumber(discriminant))
+    with IterationRecorder("series.jsonl", cost_tracking=ct) as recorder:
+        for _ in range(iterations):
+            recorder.start()
+            cube = entry.run(cube, info)
+            recorder.stop(cube)
+    print(recorder.summary())
+"""
+
+import csv
+import json
+import math
+import time
+
+from algocomp.tracked_number import coerce_int
+
+
+class Histogram:
+    """
+    Histogram of positive values in logarithmic buckets, with
+    `resolution` buckets per power of 2, so percentiles are within a
+    relative error of about 2^(1/resolution) - 1 (4.4% by default).
+
+    The number of buckets is bounded by the range of the values, not by
+    how many are added. The exact count, minimum, maximum and mean are
+    also kept.
+    """
+
+    def __init__(self, resolution=16):
+        self.resolution = resolution
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        self.count += 1
+        self.total += x
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        i = math.floor(math.log2(x) * self.resolution) if x > 0 else None
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+
+    def percentile(self, p):
+        """
+        The value below which p percent of the values are, as the upper
+        bound of its bucket, clipped to the range of the values.
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = self.buckets.get(None, 0)
+        if seen >= rank:
+            return self.min
+        for i in sorted(k for k in self.buckets if k is not None):
+            seen += self.buckets[i]
+            if seen >= rank:
+                bound = 2.0 ** ((i + 1) / self.resolution)
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": (self.total / self.count) if self.count else None,
+            "min": self.min,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+
+class IterationRecorder:
+    """
+    Records one row per iteration:
+      iteration, cost (with cost tracking, else None), seconds, and the
+      largest and smallest bit length of the cube entries
+    with cost tracking, the JSONL rows also have the number of calls of
+    each tracked routine in the iteration, so iterations taking a rare
+    path (fewer exact_div calls when y == 0 in construct_nudupl_cube,
+    for example) can be picked out.
+
+    The rare paths of the squaring, y == 0 in construct_nudupl_cube and
+    z == 0 in bqf.nudupl (which entry.run does not call), are taken when
+    the form needs no partial reduction, a <= L. From the default form
+    (2, 1, c), the bit length of a doubles each squaring, so they are
+    taken in the first log2(log2(L)) or so iterations (7 at 512 bits) and
+    after that only with a probability of about |D|^(-1/4).
+
+    The file format is CSV for a path ending in .csv, otherwise JSONL.
+    Rows are written as they are recorded, and flushed every
+    flush_interval rows.
+    """
+
+    fields = ("iteration", "cost", "seconds", "max_bits", "min_bits")
+
+    def __init__(self, path=None, cost_tracking=None, format=None,
+                 flush_interval=1000):
+        if format is None:
+            format = "csv" if (path or "").endswith(".csv") else "jsonl"
+        if format not in ("csv", "jsonl"):
+            raise ValueError("unknown format {}".format(format))
+        self.format = format
+        self.cost_tracking = cost_tracking
+        self.flush_interval = flush_interval
+        self.iterations = 0
+        self.cost_histogram = Histogram()
+        self.time_histogram = Histogram()
+        self._start = None
+
+        self._file = None
+        self._csv = None
+        if path is not None:
+            self._file = open(path, "w", newline="")
+            if format == "csv":
+                self._csv = csv.writer(self._file)
+                self._csv.writerow(self.fields)
+
+    def start(self):
+        """mark the start of an iteration"""
+        ct = self.cost_tracking
+        if ct is not None:
+            self._start = (ct.cost, dict(ct.num_routine), time.perf_counter())
+        else:
+            self._start = (None, None, time.perf_counter())
+
+    def stop(self, values=()):
+        """
+        mark the end of an iteration started with start, values are the
+        operands to report the sizes of (such as the new cube)
+        """
+        end = time.perf_counter()
+        cost, routines, start = self._start
+        self._start = None
+        ct = self.cost_tracking
+        if ct is not None:
+            cost = ct.cost - cost
+            routines = dict((name, n - routines.get(name, 0))
+                            for name, n in ct.num_routine.items()
+                            if n != routines.get(name, 0))
+        self.record(end - start, cost, values, routines)
+
+    def record(self, seconds, cost=None, values=(), routines=None):
+        """record an iteration directly"""
+        bits = [abs(coerce_int(v)).bit_length() for v in values]
+        row = {
+            "iteration": self.iterations,
+            "cost": cost,
+            "seconds": seconds,
+            "max_bits": max(bits) if bits else None,
+            "min_bits": min(bits) if bits else None,
+        }
+        self.iterations += 1
+        if cost is not None:
+            self.cost_histogram.add(cost)
+        self.time_histogram.add(seconds)
+
+        if self._file is not None:
+            if self._csv is not None:
+                self._csv.writerow([row[k] for k in self.fields])
+            else:
+                if routines is not None:
+                    row["routines"] = routines
+                self._file.write(json.dumps(row) + "\n")
+            if self.iterations % self.flush_interval == 0:
+                self._file.flush()
+
+    def summary(self):
+        """percentiles of the cost and seconds per iteration"""
+        s = {
+            "iterations": self.iterations,
+            "seconds": self.time_histogram.to_dict(),
+        }
+        if self.cost_histogram.count:
+            s["cost"] = self.cost_histogram.to_dict()
+        return s
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,142 @@
+import math
+import random
+
+from algocomp import CostTracking, nudupl, nucomp, nucube, reduce_form
+from algocomp.tracked_number import coerce_int
+from inkfish.classgroup import ClassGroup
+from inkfish.create_discriminant import create_discriminant
+
+
+def small_forms(D, count):
+    """forms (a, b, c) of discriminant D with small prime a"""
+    forms = []
+    a = 3
+    while len(forms) < count:
+        if all(a % p for p in range(2, a)):
+            for b in range(1, 2*a, 2):
+                if (b*b - D) % (4*a) == 0:
+                    forms.append(ClassGroup(a, b, (b*b - D) // (4*a)))
+                    break
+        a += 1
+    return forms
+
+
+def sample_forms(D, count=12, seed=1):
+    """
+    reduced forms of discriminant D, the small forms and products of them
+    built with ClassGroup.multiply
+    """
+    rng = random.Random(seed)
+    base = small_forms(D, 6)
+    forms = [x.reduced() for x in base]
+    for _ in range(count):
+        x = base[rng.randrange(len(base))].reduced()
+        for _ in range(rng.randint(1, 20)):
+            x = x.multiply(base[rng.randrange(len(base))])
+        forms.append(x)
+    return forms
+
+
+# a prime discriminant, and a composite one (where gcd(a, b) > 1 happens)
+DISCRIMINANTS = [create_discriminant(b"bqf", 256),
+                 -(3 * 5 * 7 * 11 * 13 * 17 * 19 * 23 * 1000003 * 1000039)]
+
+
+def is_partially_reduced(form, D):
+    a, b, c = form
+    return b*b - 4*a*c == D and a > 0 and c > 0
+
+
+def test_nudupl():
+    for D in DISCRIMINANTS:
+        for f in sample_forms(D):
+            expected = f.multiply(f)
+            assert nudupl(*f, full=True) == tuple(expected)
+            partial = nudupl(*f)
+            assert is_partially_reduced(partial, D)
+            assert ClassGroup(*partial) == expected
+            assert f.square() == expected
+
+
+def test_nucomp():
+    for D in DISCRIMINANTS:
+        forms = sample_forms(D)
+        pairs = list(zip(forms, forms[1:])) + [
+            (forms[0], forms[0]), (forms[1], forms[1].inverse()),
+            (forms[2], forms[2].identity())]
+        for f1, f2 in pairs:
+            expected = f1.multiply(f2)
+            assert nucomp(*f1, *f2, full=True) == tuple(expected)
+            partial = nucomp(*f1, *f2)
+            assert is_partially_reduced(partial, D)
+            assert ClassGroup(*partial) == expected
+
+
+def test_nucube():
+    for D in DISCRIMINANTS:
+        for f in sample_forms(D):
+            # includes gcd(a, b) > 1, the nucomp(nudupl(f), f) fallback
+            expected = f.multiply(f).multiply(f)
+            assert nucube(*f, full=True) == tuple(expected)
+            partial = nucube(*f)
+            assert is_partially_reduced(partial, D)
+            assert ClassGroup(*partial) == expected
+            assert f ** 3 == expected
+
+
+def test_nucomp_tracked():
+    D = DISCRIMINANTS[0]
+    ct = CostTracking()
+    forms = sample_forms(D, 4)
+    for f1, f2 in zip(forms, forms[1:]):
+        result = nucomp(*(ct.NewNumber(x) for x in f1 + f2), full=True)
+        assert tuple(coerce_int(x) for x in result) == tuple(f1.multiply(f2))
+    assert ct.num_routine["nucomp"] == len(forms) - 1
+
+
+def test_nucube_tracked():
+    D = DISCRIMINANTS[0]
+    ct = CostTracking()
+    forms = sample_forms(D, 4)
+    for f in forms:
+        result = nucube(*(ct.NewNumber(x) for x in f), full=True)
+        assert tuple(coerce_int(x) for x in result) == \
+            tuple(f.multiply(f).multiply(f))
+    assert ct.num_routine["nucube"] == len(forms)
+
+
+def reduced_forms(D):
+    """all primitive reduced forms of a small discriminant D"""
+    a = 1
+    while 3*a*a <= -D:
+        for b in range(-a + 1, a + 1):
+            if (b*b - D) % (4*a) == 0:
+                c = (b*b - D) // (4*a)
+                if c >= a and not (b < 0 and a == c) and \
+                        math.gcd(a, b, c) == 1:
+                    yield (a, b, c)
+        a += 1
+
+
+SMALL_DISCRIMINANTS = [-15015, -1000003] + list(range(-3, -2000, -4))
+
+
+def test_nucube_small_discriminants():
+    # includes the partial Euclid ending at a zero remainder, such as
+    # (17, 9, 222) and (73, 43, 3431)
+    for D in SMALL_DISCRIMINANTS:
+        for f in reduced_forms(D):
+            expected = nucomp(*nudupl(*f), *f, full=True)
+            assert nucube(*f, full=True) == expected
+            partial = nucube(*f)
+            assert is_partially_reduced(partial, D)
+            assert reduce_form(*partial, full=True) == expected
+
+
+def test_nucube_small_discriminants_tracked():
+    ct = CostTracking()
+    for D in SMALL_DISCRIMINANTS[:2] + SMALL_DISCRIMINANTS[2::25]:
+        for f in reduced_forms(D):
+            result = nucube(*(ct.NewNumber(x) for x in f), full=True)
+            assert tuple(coerce_int(x) for x in result) == \
+                nucomp(*nudupl(*f), *f, full=True)
@@ -0,0 +1,93 @@
+import json
+import random
+
+import pytest
+
+import calibrate_costs
+from algocomp import CostTracking
+from algocomp.cost_tracking import (COST_MODELS, OPERATIONS, PowerCostModel,
+                                    cost_model_from_dict)
+from calibrate_costs import fit_model
+
+OVERHEADS = {"add": 30.0, "sub": 32.0, "mul": 45.0, "div": 120.0,
+             "shift": 25.0}
+SCALES = {"add": 0.05, "sub": 0.06, "mul": 0.02, "div": 0.04,
+          "shift": 0.03}
+
+
+def synthetic_samples(model, noise=0.0, seed=1):
+    """samples of the calibrate_costs shapes, timed by the model"""
+    rng = random.Random(seed)
+    samples = []
+    for n in calibrate_costs.DEFAULT_BITS:
+        for name, f, shape in calibrate_costs.OPERATION_SHAPES:
+            xbits, ybits = shape(n)
+            t = (model.overheads[name]
+                 + model.scales[name] * model.shape(name, xbits, ybits))
+            samples.append((name, xbits, ybits,
+                            t * (1 + rng.uniform(-noise, noise))))
+    return samples
+
+
+def test_fit_model_recovers_parameters():
+    base = COST_MODELS["karatsuba"]
+    truth = PowerCostModel("host", base.mul_exponent, base.fast_division,
+                           SCALES, OVERHEADS)
+    model, error = fit_model(base, synthetic_samples(truth))
+    assert model.name == "calibrated_karatsuba"
+    # the error left is from the costs being rounded to whole nanoseconds
+    assert error < 0.01
+    for op in OPERATIONS:
+        assert model.overheads[op] == pytest.approx(OVERHEADS[op])
+        assert model.scales[op] == pytest.approx(SCALES[op])
+
+    # with 2% noise, the parameters are still close and the error small
+    model, error = fit_model(base, synthetic_samples(truth, noise=0.02))
+    assert error < 0.03
+    for op in OPERATIONS:
+        assert model.overheads[op] == pytest.approx(OVERHEADS[op], rel=0.2)
+        assert model.scales[op] == pytest.approx(SCALES[op], rel=0.05)
+
+    # the model of the wrong multiplication fits worse
+    assert fit_model(COST_MODELS["schoolbook"],
+                     synthetic_samples(truth))[1] > 0.1
+
+
+def test_calibrate_picks_best_model(monkeypatch):
+    base = COST_MODELS["toom3"]
+    truth = PowerCostModel("host", base.mul_exponent, base.fast_division,
+                           SCALES, OVERHEADS)
+    samples = synthetic_samples(truth)
+    monkeypatch.setattr(calibrate_costs, "measure",
+                        lambda bits_list, count, seed: samples)
+    report = calibrate_costs.calibrate()
+    assert report["model"]["name"] == "calibrated_toom3"
+    assert report["fits"]["toom3"]["relative_rms_error"] < 0.01
+    assert len(report["samples"]) == len(samples)
+
+
+def test_model_json_round_trip(tmp_path):
+    base = COST_MODELS["karatsuba"]
+    model, error = fit_model(base, synthetic_samples(
+        PowerCostModel("host", base.mul_exponent, base.fast_division,
+                       SCALES, OVERHEADS)))
+    path = str(tmp_path / "host_costs.json")
+    with open(path, "w") as f:
+        f.write(json.dumps(model.to_dict(), indent=2, sort_keys=True))
+
+    loaded = CostTracking(model=path).model
+    assert loaded.to_dict() == model.to_dict()
+    for op in OPERATIONS:
+        for xbits, ybits in ((64, 64), (1024, 512), (4096, 4096)):
+            assert loaded.cost(op, xbits, ybits) == \
+                model.cost(op, xbits, ybits)
+
+    ct = CostTracking(model=path)
+    x = ct.NewNumber(3 ** 500)
+    x * x
+    assert ct.cost == model.mul(793, 793)
+
+    assert cost_model_from_dict(COST_MODELS["contest"].to_dict()) is \
+        COST_MODELS["contest"]
+    assert cost_model_from_dict(COST_MODELS["toom3"].to_dict()).to_dict() \
+        == COST_MODELS["toom3"].to_dict()
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from inkfish import classgroup
+from inkfish.classgroup import ClassGroup
+from inkfish.create_discriminant import create_discriminant
+
+
+D = create_discriminant(b"classgroup", 256)
+
+
+def simple_pow(g, n):
+    """square and multiply with the baseline ClassGroup.multiply"""
+    if n < 0:
+        g, n = g.inverse(), -n
+    x = g.identity()
+    for bit in bin(n)[2:]:
+        x = x.multiply(x)
+        if bit == "1":
+            x = x.multiply(g)
+    return x
+
+
+def simple_multi_pow(bases, exponents):
+    x = bases[0].identity()
+    for g, e in zip(bases, exponents):
+        x = x.multiply(simple_pow(g, e))
+    return x
+
+
+def sample_elements(count, seed=1):
+    rng = random.Random(seed)
+    g = ClassGroup.from_ab_discriminant(2, 1, D)
+    return [simple_pow(g, rng.getrandbits(64)) for _ in range(count)]
+
+
+def test_multi_pow():
+    rng = random.Random(2)
+    for count in (1, 2, 3, 5, 20):
+        bases = sample_elements(count, seed=count)
+        for bits in (1, 8, 100):
+            exponents = [rng.getrandbits(bits) * rng.choice((1, -1))
+                         for _ in range(count)]
+            assert ClassGroup.multi_pow(bases, exponents) == \
+                simple_multi_pow(bases, exponents)
+
+
+def test_multi_pow_edge_cases():
+    g, h = sample_elements(2)
+    assert ClassGroup.multi_pow([g, h], [0, 0]) == g.identity()
+    assert ClassGroup.multi_pow([g, h], [0, 5]) == simple_pow(h, 5)
+    assert ClassGroup.multi_pow([g, g.inverse()], [7, 7]) == g.identity()
+    with pytest.raises(ValueError):
+        ClassGroup.multi_pow([], [])
+
+
+def test_straus_and_pippenger():
+    rng = random.Random(3)
+    bases = sample_elements(12, seed=3)
+    exponents = [rng.getrandbits(rng.randint(1, 80)) + 1 for _ in bases]
+    expected = simple_multi_pow(bases, exponents)
+    pairs = list(zip(bases, exponents))
+    for w in (1, 3, 5):
+        assert classgroup._straus(pairs, w) == expected
+    for c in (1, 2, 4, 7):
+        assert classgroup._pippenger(pairs, c) == expected
+    assert classgroup._shamir(pairs[:2]) == \
+        simple_multi_pow(bases[:2], exponents[:2])
+
+
+def unreduced(x, n):
+    """an equivalent form of x which is not reduced, (x,y) -> (x + ny, y)"""
+    a, b, c = x
+    return ClassGroup(a, b + 2 * a * n, a * n * n + b * n + c)
+
+
+def test_square():
+    for x in sample_elements(10, seed=4) + [unreduced(x, 5) for x in
+                                            sample_elements(3, seed=5)]:
+        y = x.square()
+        assert y == x * x
+        assert tuple(y) == tuple(x.multiply(x))
+        assert y._reduced
+    assert classgroup._nudupl_bounds[D] ** 4 <= -D // 4
+
+
+def test_reduced_eq_and_hash():
+    for x in sample_elements(5, seed=6):
+        assert x._reduced
+        for n in (1, -3, 40):
+            y = unreduced(x, n)
+            assert not y._reduced
+            assert tuple(y) != tuple(x)
+            assert x == y and y == x
+            assert not x != y
+            assert hash(x) == hash(y)
+            assert y.reduced() == x
+            assert tuple(y.reduced()) == tuple(x)
+        assert x != x.square()
+    assert len(set([x, unreduced(x, 2), x.square()])) == 2
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+import entry
+from algocomp import CostTracking
+from inkfish.create_discriminant import create_discriminant
+
+
+def folded_costs(ct):
+    lines = ct.profile_folded().splitlines()
+    return dict((path, int(cost)) for path, cost in
+                (line.rsplit(" ", 1) for line in lines))
+
+
+def test_profile_nested_routines():
+    ct = CostTracking(profile=True)
+    x = ct.NewNumber(3 ** 200)
+    y = x * x
+
+    ct.routine_start("outer")
+    outer = ct.cost
+    y = y + x
+    for _ in range(2):
+        ct.routine_start("inner")
+        inner = ct.cost
+        y = y * x
+        ct.routine_stop("inner", inner)
+    y = y // x
+    ct.routine_stop("outer", outer)
+
+    root = ct.profile()
+    assert root.cost == ct.cost
+    assert sum(node.exclusive_cost() for _, node in root.walk()) == ct.cost
+    nodes = dict((path, node) for path, node in root.walk())
+    assert list(nodes) == [("total",), ("total", "outer"),
+                           ("total", "outer", "inner")]
+    outer_node = nodes["total", "outer"]
+    inner_node = nodes["total", "outer", "inner"]
+    assert outer_node.calls == 1 and inner_node.calls == 2
+    assert inner_node.cost == inner_node.exclusive_cost() == \
+        ct.cost_routine["inner"]
+    assert outer_node.cost == ct.cost_routine["outer"]
+    # one multiplication before outer, an add and a division in it, and
+    # a multiplication in each call of inner
+    assert root.exclusive_ops()[2] == 1
+    assert outer_node.exclusive_ops()[:4] == [1, 0, 0, 1]
+    assert inner_node.ops[2] == 2
+
+    assert folded_costs(ct) == {
+        "total": root.exclusive_cost(),
+        "total;outer": outer_node.exclusive_cost(),
+        "total;outer;inner": inner_node.cost,
+    }
+
+    data = json.loads(ct.profile_json())
+    assert data["inclusive_cost"] == ct.cost
+    (outer_dict,) = data["children"]
+    assert outer_dict["name"] == "outer"
+    assert outer_dict["children"][0]["calls"] == 2
+    assert outer_dict["exclusive_operations"]["div"]["count"] == 1
+
+    with pytest.raises(ValueError):
+        CostTracking().profile()
+
+
+def test_profile_squarings():
+    D = create_discriminant(b"profile", 512)
+    ct = CostTracking(profile=True)
+    cube, info = entry.setup(ct.NewNumber(D))
+    for _ in range(20):
+        cube = entry.run(cube, info)
+
+    root = ct.profile()
+    assert sum(node.exclusive_cost() for _, node in root.walk()) == ct.cost
+    costs = folded_costs(ct)
+    assert sum(costs.values()) == ct.cost
+    # gcd is called from solve_linear_x, inside construct_nudupl_cube
+    path = "total;construct_nudupl_cube;solve_linear_x;gcd"
+    assert costs[path] > 0
+    assert not any(p.endswith(";gcd") for p in costs if p != path)
+
+    by_routine = dict((name, (exclusive, inclusive)) for
+                      name, exclusive, inclusive in ct.profile_by_routine())
+    assert by_routine["gcd"] == (costs[path], ct.cost_routine["gcd"])
+    assert by_routine["construct_nudupl_cube"][1] == \
+        ct.cost_routine["construct_nudupl_cube"]
+
+    data = json.loads(ct.profile_json())
+    assert data["inclusive_cost"] == ct.cost
+    names = [child["name"] for child in data["children"]]
+    assert "construct_nudupl_cube" in names
@@ -0,0 +1,74 @@
+import math
+
+from algocomp import (CostTracking, isqrt, construct_nudupl_cube,
+                      construct_nucomp_cube, compose_with_cube, cube_form1,
+                      cube_form3)
+from algocomp.tracked_number import coerce_int
+from inkfish.classgroup import ClassGroup
+
+from test_bqf import DISCRIMINANTS, sample_forms
+
+
+def cube_form2(cube):
+    a, b, c, d, e, f, g, h = cube
+    return (c*e - a*g, -a*h - b*g + c*f + d*e, d*f - b*h)
+
+
+def bound(D):
+    return isqrt(isqrt(-D//4))
+
+
+def test_construct_nudupl_cube():
+    for D in DISCRIMINANTS:
+        for f in sample_forms(D):
+            if math.gcd(f[0], f[1]) != 1:
+                # construct_nudupl_cube assumes gcd(A, B) = 1
+                continue
+            cube = construct_nudupl_cube(*f, bound(D))
+            assert cube_form1(cube) == tuple(f)
+            assert cube_form2(cube) == tuple(f)
+            # form1 form2 form3 = 1
+            A3, B3, C3 = cube_form3(cube)
+            assert ClassGroup(A3, -B3, C3) == f.multiply(f)
+
+
+def test_construct_nucomp_cube():
+    for D in DISCRIMINANTS:
+        forms = sample_forms(D)
+        for f1, f2 in zip(forms, forms[1:]):
+            if f1[0] < f2[0]:
+                f1, f2 = f2, f1
+            cube = construct_nucomp_cube(*f1, *f2, bound(D))
+            assert cube_form1(cube) == tuple(f1)
+            # form 2 may be replaced by an equivalent form
+            assert ClassGroup(*cube_form2(cube)) == f2
+            A3, B3, C3 = cube_form3(cube)
+            assert B3*B3 - 4*A3*C3 == D
+
+
+def test_compose_with_cube():
+    for D in DISCRIMINANTS:
+        forms = sample_forms(D)
+        pairs = list(zip(forms, forms[1:])) + [
+            (forms[0], forms[0]), (forms[1], forms[1].inverse()),
+            (forms[2], forms[2].identity())]
+        for f1, f2 in pairs:
+            expected = f1.multiply(f2)
+            assert compose_with_cube(*f1, *f2, bound(D), True) == \
+                tuple(expected)
+            assert ClassGroup(*compose_with_cube(*f1, *f2, bound(D))) == \
+                expected
+
+
+def test_compose_with_cube_tracked():
+    D = DISCRIMINANTS[0]
+    forms = sample_forms(D, 4)
+    ct = CostTracking()
+    L = ct.NewNumber(bound(D))
+    for f1, f2 in zip(forms, forms[1:]):
+        result = compose_with_cube(*(ct.NewNumber(x) for x in f1 + f2), L,
+                                   True)
+        assert tuple(coerce_int(x) for x in result) == \
+            tuple(f1.multiply(f2))
+    assert ct.num_routine["compose_with_cube"] == len(forms) - 1
+    assert ct.num_routine["construct_nucomp_cube"] == len(forms) - 1
@@ -0,0 +1,69 @@
+import pytest
+
+import entry
+from discriminant_cache import (CacheEntry, DiscriminantCache, compute_entry,
+                                pack_ints, unpack_ints)
+
+
+def test_pack_ints_round_trip():
+    for values in ([], [0], [0, -1, 1, 127, 128, -128, -129, 255, 256],
+                   [-(1 << 2048) + 12345, 1 << 4000, -7, 0]):
+        blob = pack_ints(values)
+        assert unpack_ints(blob) == values
+    # 0 and -1 take a single byte
+    assert len(pack_ints([0, -1])) == len(pack_ints([])) + 2 * (2 + 1)
+
+    with pytest.raises(ValueError):
+        unpack_ints(b"\xff" + pack_ints([1])[1:])
+
+
+def test_get_put_and_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with DiscriminantCache(path) as cache:
+        assert cache.get(b"seed", 256) is None
+        computed = cache.get_or_create(b"seed", 256)
+        assert computed == compute_entry(b"seed", 256)
+        assert len(cache) == 1
+    with DiscriminantCache(path) as cache:
+        cached = cache.get(b"seed", 256)
+        assert isinstance(cached, CacheEntry)
+        assert cached == computed
+        assert cached.discriminant < 0 and len(cached.cube) == 8
+
+
+def test_lru_eviction(tmp_path):
+    with DiscriminantCache(str(tmp_path / "cache.db"),
+                           max_entries=3) as cache:
+        entries = dict((seed, compute_entry(seed, 64))
+                       for seed in (b"a", b"b", b"c", b"d", b"e"))
+        for seed in (b"a", b"b", b"c"):
+            cache.put(seed, 64, entries[seed])
+        assert len(cache) == 3
+        # using a makes b the least recently used
+        assert cache.get(b"a", 64) == entries[b"a"]
+        cache.put(b"d", 64, entries[b"d"])
+        assert len(cache) == 3
+        assert cache.get(b"b", 64) is None
+        assert cache.get(b"c", 64) == entries[b"c"]
+        cache.put(b"e", 64, entries[b"e"])
+        assert [cache.get(seed, 64) is not None
+                for seed in (b"a", b"c", b"d", b"e")] == \
+            [False, True, True, True]
+
+
+def test_setup_matches_entry_setup(tmp_path):
+    cache_entry = compute_entry(b"setup", 512)
+    with DiscriminantCache(str(tmp_path / "cache.db")) as cache:
+        for full_reduction in (False, True):
+            # the first setup computes the entry, the second reads it back
+            for _ in range(2):
+                cube, info = cache.setup(b"setup", 512, full_reduction)
+                expected = entry.setup(cache_entry.discriminant,
+                                       full_reduction)
+                assert cube == expected[0]
+                assert info == expected[1]
+                for _ in range(5):
+                    cube = entry.run(cube, info)
+                    expected = (entry.run(expected[0], expected[1]),
+                                expected[1])
+                assert cube == expected[0]
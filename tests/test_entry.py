@@ -0,0 +1,55 @@
+import importlib
+
+import entry
+from algocomp import CostTracking
+from algocomp.tracked_number import coerce_int
+from inkfish.create_discriminant import create_discriminant
+
+
+def squarings(discriminant, iterations, full_reduction):
+    cube, info = entry.setup(discriminant, full_reduction)
+    cubes = []
+    for _ in range(iterations):
+        cube = entry.run(cube, info)
+        cubes.append(tuple(coerce_int(x) for x in cube))
+    return cubes
+
+
+def test_plain_and_tracked_squarings_match():
+    # plain ints take the fast CPython paths (pow inverses, the plain
+    # partial_xgcd loop, ...), tracked numbers the cost model ones
+    D = create_discriminant(b"test", 512)
+    for full_reduction in (False, True):
+        ct = CostTracking()
+        assert squarings(D, 30, full_reduction) == \
+            squarings(ct.NewNumber(D), 30, full_reduction)
+        assert ct.num_routine["construct_nudupl_cube"] == 31
+
+
+
+def test_production_mode():
+    cost_tracking = importlib.import_module("algocomp.cost_tracking")
+    # algocomp.gcd is the function, the module is only in sys.modules
+    gcd_module = importlib.import_module("algocomp.gcd")
+    D = create_discriminant(b"test", 512)
+
+    # a plain discriminant binds the no-op helpers and turns checks off
+    entry.setup(D)
+    assert cost_tracking.production_mode
+    assert gcd_module.routine_tracking_start is \
+        cost_tracking._no_tracking_start
+    assert not gcd_module.CHECKS
+
+    # a new CostTracking turns production mode off
+    ct = CostTracking()
+    assert not cost_tracking.production_mode
+    assert gcd_module.routine_tracking_start is \
+        cost_tracking.routine_tracking_start
+    assert gcd_module.CHECKS
+
+    # and so does a tracked setup, so its routines are counted
+    entry.setup(D)
+    cube, info = entry.setup(ct.NewNumber(D))
+    assert not cost_tracking.production_mode
+    entry.run(cube, info)
+    assert ct.num_routine["construct_nudupl_cube"] == 2
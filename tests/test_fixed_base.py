@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from inkfish.classgroup import ClassGroup
+from inkfish.fixed_base import FixedBaseTable
+
+from test_classgroup import D, simple_pow
+
+
+def test_fixed_base_pow():
+    g = ClassGroup.from_ab_discriminant(2, 1, D)
+    rng = random.Random(1)
+    for window_bits in (1, 3, 4):
+        table = FixedBaseTable(g, 64, window_bits)
+        assert table.bits >= 64
+        for n in [0, 1, 2, 15, 16, -5] + [rng.getrandbits(b)
+                                           for b in (10, 64, 100)]:
+            assert table.pow(n) == simple_pow(g, n)
+
+
+def test_serialization_round_trip(tmp_path):
+    g = ClassGroup.from_ab_discriminant(2, 1, D).square()
+    table = FixedBaseTable(g, 40, 3)
+    data = table.serialize()
+    copy = FixedBaseTable.from_bytes(data)
+    assert copy.window_bits == table.window_bits
+    assert copy.bits == table.bits
+    assert copy.base == table.base
+    assert copy.top == table.top
+    assert copy.entries == table.entries
+    assert copy.serialize() == data
+    assert copy.pow(12345678901) == table.pow(12345678901)
+
+    path = str(tmp_path / "table.bin")
+    table.save(path)
+    assert FixedBaseTable.load(path).serialize() == data
+
+    with pytest.raises(ValueError):
+        FixedBaseTable.from_bytes(data + b"\0")
+
+
+def test_registered_table():
+    g = ClassGroup.from_ab_discriminant(2, 1, D).square().square()
+    h = ClassGroup.from_ab_discriminant(2, 1, D)
+    table = FixedBaseTable(g, 32).register()
+    try:
+        assert g.fixed_base_table() is table
+        assert g ** 1000 == simple_pow(g, 1000)
+        assert ClassGroup.multi_pow([g, h], [77, -9]) == \
+            simple_pow(g, 77).multiply(simple_pow(h, -9))
+    finally:
+        ClassGroup.unregister_fixed_base(g)
+    assert g.fixed_base_table() is None
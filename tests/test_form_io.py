@@ -0,0 +1,110 @@
+import pytest
+
+from inkfish.form_io import (CUBE, FORM, RecordMapping, RecordReader,
+                             RecordWriter, write_records)
+
+from test_classgroup import D, sample_elements
+
+
+def sample_cubes(count):
+    return [tuple((-1) ** j * (i * 1000003 + j) << (i * 7) for j in range(8))
+            for i in range(count)]
+
+
+def test_form_round_trip(tmp_path):
+    path = str(tmp_path / "forms.bin")
+    forms = [x.reduced() for x in sample_elements(10)]
+    write_records(path, FORM, D, forms)
+    with RecordReader.open(path) as reader:
+        assert reader.kind == FORM
+        assert reader.discriminant == D
+        assert len(reader) == len(forms)
+        assert list(reader) == forms
+        assert reader[-1] == forms[-1]
+        assert reader[2:5] == forms[2:5]
+        with pytest.raises(IndexError):
+            reader[len(forms)]
+
+
+def test_cube_round_trip(tmp_path):
+    path = str(tmp_path / "cubes.bin")
+    cubes = sample_cubes(6)
+    write_records(path, CUBE, D, cubes)
+    with open(path, "rb") as f:
+        reader = RecordReader(f.read())
+    assert reader.kind == CUBE
+    assert list(reader) == cubes
+
+    with pytest.raises(ValueError):
+        write_records(path, CUBE, D, [cubes[0][:7]])
+
+
+def test_append(tmp_path):
+    path = str(tmp_path / "cubes.bin")
+    cubes = sample_cubes(9)
+    write_records(path, CUBE, D, cubes[:4])
+    write_records(path, CUBE, D, cubes[4:])
+    with RecordReader.open(path) as reader:
+        assert list(reader) == cubes
+
+
+def test_append_after_partial_record(tmp_path):
+    path = str(tmp_path / "cubes.bin")
+    cubes = sample_cubes(5)
+    write_records(path, CUBE, D, cubes[:3])
+    # an interrupted writer left part of a record at the end
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    with RecordReader.open(path) as reader:
+        assert list(reader) == cubes[:3]
+
+    write_records(path, CUBE, D, cubes[3:])
+    with RecordReader.open(path) as reader:
+        assert list(reader) == cubes
+
+
+def test_append_oversized_entry(tmp_path):
+    path = str(tmp_path / "cubes.bin")
+    cubes = sample_cubes(4)
+    with RecordWriter(path, CUBE, D) as writer:
+        writer.append(cubes[0])
+        # only the last entry is too large, nothing of the record is kept
+        too_large = cubes[1][:7] + (1 << (8 * writer.int_size),)
+        with pytest.raises(OverflowError):
+            writer.append(too_large)
+        writer.extend(cubes[1:])
+    with RecordReader.open(path) as reader:
+        assert list(reader) == cubes
+
+
+def test_header_mismatch(tmp_path):
+    path = str(tmp_path / "forms.bin")
+    forms = [x.reduced() for x in sample_elements(2)]
+    write_records(path, FORM, D, forms)
+    with pytest.raises(ValueError):
+        RecordWriter(path, CUBE, D)
+    with pytest.raises(ValueError):
+        RecordWriter(path, FORM, D - 8)
+    with pytest.raises(ValueError):
+        RecordWriter(path, FORM, D, int_size=100)
+    with RecordReader.open(path) as reader:
+        assert list(reader) == forms
+
+    with pytest.raises(ValueError):
+        RecordReader(b"NOPE" + bytes(20))
+
+
+def test_record_mapping(tmp_path):
+    path = str(tmp_path / "forms.bin")
+    forms = [x.reduced() for x in sample_elements(4)]
+    write_records(path, FORM, D, forms)
+    keys = [1, 2, 4, 8]
+    with RecordReader.open(path) as reader:
+        powers = RecordMapping(reader, keys)
+        assert len(powers) == 4
+        assert list(powers) == keys
+        assert powers[4] == forms[2]
+        with pytest.raises(KeyError):
+            powers[3]
+        with pytest.raises(ValueError):
+            RecordMapping(reader, keys[:3])
@@ -0,0 +1,141 @@
+import importlib
+import math
+import random
+
+from algocomp import (CostTracking, xgcd, partial_xgcd, partial_xgcd_lehmer)
+from algocomp.gcd import hgcd_reduce, HGCD_THRESHOLD
+from algocomp.int_div import divmod_min
+from algocomp.tracked_number import coerce_int
+from inkfish.mod import extended_gcd
+
+
+def simple_xgcd(a, b):
+    """the plain loop of xgcd, without the half-gcd engine"""
+    x0, x1, y0, y1 = 0, 1, 1, 0
+    while a != 0:
+        q, r = divmod_min(b, a)
+        y0, y1 = y1, y0 - q * y1
+        x0, x1 = x1, x0 - q * x1
+        b, a = a, r
+    if b < 0:
+        return (-b, -x0, -y0)
+    return (b, x0, y0)
+
+
+def random_pairs(bits, count, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        a = rng.getrandbits(bits) * rng.choice((1, -1))
+        b = rng.getrandbits(rng.randint(1, bits)) * rng.choice((1, -1))
+        yield a, b
+
+
+def test_xgcd_small_cases():
+    for a, b in [(0, 0), (0, 5), (5, 0), (12, 18), (-12, 18), (1, 1),
+                 (17, -1)]:
+        assert xgcd(a, b) == simple_xgcd(a, b)
+
+
+def test_xgcd_matches_plain_loop():
+    for bits in (64, 300, 1024):
+        for a, b in random_pairs(bits, 20):
+            g, x, y = xgcd(a, b)
+            assert g == math.gcd(a, b)
+            assert a * x + b * y == g
+            assert (g, x, y) == simple_xgcd(a, b)
+
+
+def test_xgcd_tracked_uses_hgcd_with_same_cofactors():
+    ct = CostTracking()
+    for a, b in random_pairs(4 * HGCD_THRESHOLD, 10, seed=2):
+        result = xgcd(ct.NewNumber(a), ct.NewNumber(b))
+        assert tuple(coerce_int(v) for v in result) == simple_xgcd(a, b)
+    assert ct.num_routine["gcd"] == 10
+    # the half-gcd engine works on the leading bits with shifts
+    assert ct.num_shift > 0
+
+
+def test_xgcd_tracked_cost_has_no_cliff():
+    # the half-gcd steps are charged, so switching to it at the threshold
+    # lowers the cost gradually
+    rng = random.Random(9)
+    costs = []
+    for bits in (HGCD_THRESHOLD, HGCD_THRESHOLD + 1, 256, 257):
+        ct = CostTracking()
+        for _ in range(20):
+            a = rng.getrandbits(bits) | (1 << (bits - 1))
+            b = rng.getrandbits(bits - 1) | (1 << (bits - 2))
+            xgcd(ct.NewNumber(a), ct.NewNumber(b))
+        costs.append(ct.cost)
+    assert costs[1] > costs[0] / 2
+    assert costs[3] > costs[2] / 2
+
+
+def test_xgcd_plain_ints_skip_hgcd(monkeypatch):
+    # algocomp.gcd is the function, the module is only in sys.modules
+    gcd_module = importlib.import_module("algocomp.gcd")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("hgcd_reduce used for plain ints")
+    monkeypatch.setattr(gcd_module, "hgcd_reduce", fail)
+    for a, b in random_pairs(4096, 3, seed=6):
+        assert xgcd(a, b) == simple_xgcd(a, b)
+
+
+def test_hgcd_reduce_same_quotient_sequence():
+    for nearest in (True, False):
+        for a, b in random_pairs(2048, 10, seed=3):
+            u, v, (m00, m01, m10, m11) = hgcd_reduce(a, b, 64, nearest)
+            assert (u, v) == (a * m00 + b * m10, a * m01 + b * m11)
+            assert abs(m00 * m11 - m01 * m10) == 1
+            if nearest:
+                # finishing the plain loop gives the plain loop's result
+                g, x, y = simple_xgcd(u, v)
+                assert (g, x * m00 + y * m01, x * m10 + y * m11) == \
+                    simple_xgcd(a, b)
+
+
+def test_partial_xgcd_lehmer_matches_partial_xgcd():
+    rng = random.Random(4)
+    for bits in (32, 200, 1024):
+        for a, b in random_pairs(bits, 20, seed=bits):
+            L = rng.getrandbits(bits // 2) + 1
+            assert partial_xgcd_lehmer(a, b, L) == partial_xgcd(a, b, L)
+
+
+def test_partial_xgcd_lehmer_tracked():
+    rng = random.Random(7)
+    ct = CostTracking()
+    for bits in (100, 200, 1024):
+        for a, b in random_pairs(bits, 10, seed=bits):
+            L = rng.getrandbits(bits // 2) + 1
+            result = partial_xgcd_lehmer(ct.NewNumber(a), ct.NewNumber(b), L)
+            assert tuple(coerce_int(v) for v in result) == \
+                partial_xgcd(a, b, L)
+
+
+def partial_xgcd_cost(f, bits, count=20):
+    rng = random.Random(8)
+    ct = CostTracking()
+    for _ in range(count):
+        a = rng.getrandbits(bits) | (1 << (bits - 1))
+        b = rng.getrandbits(bits - 1) | (1 << (bits - 2))
+        f(ct.NewNumber(a), ct.NewNumber(b), 1 << (bits // 2))
+    return ct.cost
+
+
+def test_partial_xgcd_lehmer_charges_word_steps():
+    # the word steps are charged, so the cost has no cliff where the
+    # leading words start being used, and they pay off from two words
+    sizes = (64, 65, 127, 128, 129, 256)
+    costs = [partial_xgcd_cost(partial_xgcd_lehmer, bits) for bits in sizes]
+    for smaller, larger in zip(costs, costs[1:]):
+        assert larger > smaller / 2
+    assert costs[3] < partial_xgcd_cost(partial_xgcd, 128)
+
+
+def test_extended_gcd():
+    for a, b in random_pairs(512, 20, seed=5):
+        a, b = abs(a), abs(b)
+        r, s, t = extended_gcd(a, b)
+        assert r == math.gcd(a, b) == a * s + b * t
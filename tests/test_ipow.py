@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from algocomp import CostTracking, ipow
+from algocomp.ipow import STRATEGIES, wnaf_digits
+from algocomp.tracked_number import coerce_int
+from inkfish.classgroup import ClassGroup
+
+from test_classgroup import D, simple_pow
+
+
+def test_ipow_ints():
+    rng = random.Random(1)
+    for strategy in ("binary", "sliding", "fixed"):
+        for window in (None, 2, 3, 5):
+            for a in (-3, -1, 0, 1, 2, 7, 12345):
+                for b in [0, 1, 2, 3, 31, 32] + [rng.getrandbits(12)]:
+                    assert ipow(a, b, strategy, window) == a ** b
+    with pytest.raises(ValueError):
+        ipow(3, -2)
+    with pytest.raises(ValueError):
+        # ints have no inverse()
+        ipow(3, 5, "wnaf")
+    with pytest.raises(ValueError):
+        ipow(3, 5, "unknown")
+
+
+def test_ipow_class_group():
+    g = ClassGroup.from_ab_discriminant(2, 1, D)
+    rng = random.Random(2)
+    for strategy in STRATEGIES:
+        for b in (0, 1, 2, -1, -77, rng.getrandbits(100)):
+            assert ipow(g, b, strategy) == simple_pow(g, b)
+    assert g ** 1000 == simple_pow(g, 1000)
+
+
+def test_wnaf_digits():
+    rng = random.Random(3)
+    for w in (2, 3, 5):
+        for _ in range(50):
+            b = rng.getrandbits(60) + 1
+            digits = wnaf_digits(b, w)
+            assert sum(d << i for i, d in enumerate(digits)) == b
+            for i, d in enumerate(digits):
+                assert d == 0 or (d % 2 == 1 and abs(d) < 1 << (w - 1))
+                if d:
+                    # at most one nonzero digit in any w consecutive
+                    assert not any(digits[i + 1:i + w])
+
+
+def test_ipow_stats():
+    g = ClassGroup.from_ab_discriminant(2, 1, D)
+    b = random.Random(4).getrandbits(200) | (1 << 199)
+    counts = {}
+    for strategy in STRATEGIES:
+        stats = {}
+        assert ipow(g, b, strategy, stats=stats) == simple_pow(g, b)
+        counts[strategy] = stats
+    binary = counts["binary"]
+    assert binary["squarings"] == b.bit_length() - 1
+    assert binary["multiplications"] == bin(b).count("1") - 1
+    for strategy in ("sliding", "wnaf", "fixed"):
+        assert counts[strategy]["multiplications"] < \
+            binary["multiplications"]
+
+
+def test_tracked_exponent_is_charged():
+    # like the simple loop, one division by 2 per bit of the exponent
+    for e in (1, 5, 12345, (1 << 16) - 1):
+        ct = CostTracking()
+        assert coerce_int(ipow(7, ct.NewNumber(e))) == 7 ** e
+        assert ct.num_div == e.bit_length()
+        assert ct.cost_div == sum(ct.model.div(bits, 2)
+                                  for bits in range(1, e.bit_length() + 1))
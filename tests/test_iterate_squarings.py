@@ -0,0 +1,66 @@
+import pytest
+
+from inkfish.classgroup import ClassGroup
+from inkfish.iterate_squarings import (iterate_squarings,
+                                       iterate_squarings_stream,
+                                       read_checkpoint, write_checkpoint)
+
+from test_classgroup import D
+
+
+POWERS = [0, 1, 2, 5, 17, 40]
+
+
+def generator():
+    return ClassGroup.from_ab_discriminant(2, 1, D)
+
+
+def test_engines_match_iterate_squarings():
+    x = generator()
+    expected = iterate_squarings(x, POWERS)
+    for engine in ("classgroup", "cube"):
+        results = list(iterate_squarings_stream(x, POWERS, engine=engine))
+        assert [power for power, _ in results] == POWERS
+        for power, y in results:
+            assert y == expected[power]
+            assert tuple(y) == tuple(expected[power].reduced())
+    with pytest.raises(ValueError):
+        list(iterate_squarings_stream(x, POWERS, engine="nope"))
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    x = generator()
+    y = x.square()
+    write_checkpoint(path, x, 1, y)
+    assert read_checkpoint(path, x) == (1, y)
+    with pytest.raises(ValueError):
+        read_checkpoint(path, y)
+
+
+def test_resume_from_checkpoint(tmp_path):
+    x = generator()
+    expected = iterate_squarings(x, POWERS)
+    for engine in ("classgroup", "cube"):
+        path = str(tmp_path / (engine + ".json"))
+        stream = iterate_squarings_stream(x, POWERS, engine=engine,
+                                          checkpoint_path=path,
+                                          checkpoint_interval=8)
+        # stop after power 17, the last checkpoint is at 16
+        for power, y in stream:
+            assert y == expected[power]
+            if power == 17:
+                break
+        stream.close()
+        assert read_checkpoint(path, x)[0] == 16
+
+        resumed = list(iterate_squarings_stream(x, POWERS, engine=engine,
+                                                checkpoint_path=path,
+                                                checkpoint_interval=8))
+        assert [power for power, _ in resumed] == [17, 40]
+        for power, y in resumed:
+            assert y == expected[power]
+        # the end of the run is checkpointed too
+        iteration, form = read_checkpoint(path, x)
+        assert iteration == 40
+        assert form == expected[40]
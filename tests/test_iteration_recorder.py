@@ -0,0 +1,90 @@
+import csv
+import json
+
+import pytest
+
+import entry
+from algocomp import CostTracking
+from inkfish.create_discriminant import create_discriminant
+from iteration_recorder import Histogram, IterationRecorder
+
+
+def test_histogram_buckets():
+    # one bucket per power of 2, [2^i, 2^(i+1)), the percentile is the
+    # upper bound of the bucket clipped to the range of the values
+    h = Histogram(resolution=1)
+    assert h.percentile(50) is None
+    for x in (3, 4, 5, 100):
+        h.add(x)
+    assert h.percentile(1) == h.percentile(25) == 4
+    assert h.percentile(26) == h.percentile(75) == 8
+    assert h.percentile(76) == h.percentile(100) == 100
+
+    h = Histogram(resolution=16)
+    h.add(1)
+    h.add(1.04)
+    h.add(1.05)
+    assert h.percentile(66) == 2 ** (1 / 16.0)
+    assert h.percentile(67) == 1.05
+
+
+def test_histogram_zero_values():
+    h = Histogram()
+    for x in (0, 0, 5, 7):
+        h.add(x)
+    assert h.buckets[None] == 2
+    assert h.percentile(50) == 0
+    assert 5 <= h.percentile(75) <= 5 * 2 ** (1 / 16.0)
+    assert h.percentile(100) == 7
+    assert h.to_dict() == {
+        "count": 4, "mean": 3.0, "min": 0, "p50": 0,
+        "p90": 7, "p99": 7, "p999": 7, "max": 7,
+    }
+    assert Histogram().to_dict()["mean"] is None
+
+
+def test_jsonl_rows(tmp_path):
+    path = str(tmp_path / "series.jsonl")
+    D = create_discriminant(b"recorder", 512)
+    ct = CostTracking()
+    cube, info = entry.setup(ct.NewNumber(D))
+    with IterationRecorder(path, cost_tracking=ct, flush_interval=2) \
+            as recorder:
+        for _ in range(3):
+            recorder.start()
+            cube = entry.run(cube, info)
+            recorder.stop(cube)
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+
+    assert [row["iteration"] for row in rows] == [0, 1, 2]
+    assert sum(row["cost"] for row in rows) == \
+        recorder.cost_histogram.total
+    for row in rows:
+        assert row["seconds"] >= 0
+        assert 0 <= row["min_bits"] <= row["max_bits"] <= 512
+        assert row["routines"]["construct_nudupl_cube"] == 1
+        assert all(n > 0 for n in row["routines"].values())
+    summary = recorder.summary()
+    assert summary["iterations"] == 3
+    assert summary["cost"]["count"] == summary["seconds"]["count"] == 3
+
+
+def test_csv_rows(tmp_path):
+    path = str(tmp_path / "series.csv")
+    with IterationRecorder(path) as recorder:
+        assert recorder.format == "csv"
+        recorder.record(0.5, values=(1, -255, 3))
+        recorder.record(0.25, cost=1000)
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        list(IterationRecorder.fields),
+        ["0", "", "0.5", "8", "1"],
+        ["1", "1000", "0.25", "", ""],
+    ]
+    # no cost tracking, only the seconds have a histogram
+    assert recorder.summary()["cost"]["count"] == 1
+
+    with pytest.raises(ValueError):
+        IterationRecorder(format="xml")
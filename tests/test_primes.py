@@ -0,0 +1,84 @@
+import random
+
+from inkfish.create_discriminant import (create_discriminant,
+                                         create_discriminants)
+from inkfish.primes import (odd_primes_below_n, is_probable_prime,
+                            is_strong_probable_prime,
+                            is_strong_lucas_probable_prime, jacobi_symbol)
+
+
+def is_prime_trial_division(n):
+    if n < 2:
+        return False
+    d = 2
+    while d * d <= n:
+        if n % d == 0:
+            return False
+        d += 1
+    return True
+
+
+def test_odd_primes_below_n():
+    for n in (0, 1, 2, 3, 4, 10, 97, 98, 1000):
+        assert odd_primes_below_n(n) == \
+            [p for p in range(3, n, 2) if is_prime_trial_division(p)]
+    assert len(odd_primes_below_n(1 << 16)) == 6541
+
+
+def test_is_probable_prime_small():
+    for n in range(-5, 20000):
+        assert is_probable_prime(n) == is_prime_trial_division(n), n
+
+
+def test_pseudoprimes_are_rejected():
+    # strong pseudoprimes to base 2, Carmichael numbers, strong Lucas
+    # pseudoprimes (Selfridge method A)
+    for n in (2047, 3277, 4033, 4681, 8321, 3215031751, 2152302898747,
+              561, 1105, 1729, 41041, 825265,
+              5459, 5777, 10877, 16109, 18971, 22499):
+        assert not is_probable_prime(n), n
+    # each half of BPSW alone is fooled by them
+    assert is_strong_probable_prime(2047, 2)
+    assert is_strong_probable_prime(3215031751, 2)
+    assert is_strong_lucas_probable_prime(5459)
+    assert is_strong_lucas_probable_prime(22499)
+
+
+def test_large_numbers():
+    for e in (61, 89, 107, 127, 521, 607):
+        assert is_probable_prime(2**e - 1)
+    for e in (67, 101, 257):
+        assert not is_probable_prime(2**e - 1)
+    rng = random.Random(1)
+    primes = []
+    while len(primes) < 4:
+        n = rng.getrandbits(128) | 1
+        if is_probable_prime(n):
+            primes.append(n)
+    assert not is_probable_prime(primes[0] * primes[1])
+    assert not is_probable_prime(primes[2] * primes[2])
+    # a composite with a factor between the two trial division limits
+    assert not is_probable_prime(primes[3] * 15013 * (1 << 600 | 1))
+
+
+def test_jacobi_symbol():
+    for n in odd_primes_below_n(200):
+        for a in range(-5, 2 * n):
+            euler = pow(a, (n - 1) // 2, n)
+            expected = -1 if euler == n - 1 else euler
+            assert jacobi_symbol(a, n) == expected
+
+
+def test_create_discriminant():
+    for length in (128, 255, 512):
+        D = create_discriminant(b"primes", length)
+        assert D < 0 and (-D).bit_length() == length
+        assert -D % 8 == 7
+        assert is_probable_prime(-D)
+
+
+def test_create_discriminants():
+    seeds = [b"a", b"b", b"c"]
+    result = dict(create_discriminants(seeds, 256, processes=2))
+    assert result == dict((seed, create_discriminant(seed, 256))
+                          for seed in seeds)
@@ -0,0 +1,96 @@
+import hashlib
+from multiprocessing.dummy import Pool
+
+from inkfish import proof_pietrzak
+from inkfish.classgroup import ClassGroup
+from inkfish.create_discriminant import create_discriminant
+from inkfish.iterate_squarings import iterate_squarings
+from inkfish.proof_pietrzak import (_product_of_powers,
+                                    cache_indeces_for_count,
+                                    generate_proof, verify_proof)
+
+D = create_discriminant(b"pietrzak", 128)
+
+
+def generate_r_value(x, y, mu, int_size_bits):
+    """hash of the serialized forms, as the r values of the proof"""
+    digest = hashlib.sha256(x.serialize() + y.serialize()
+                            + mu.serialize()).digest()
+    return int.from_bytes(digest, "big") % (1 << int_size_bits)
+
+
+class RecordingPool:
+    """a thread pool that keeps the number of tasks of each starmap"""
+
+    def __init__(self, processes):
+        self._pool = Pool(processes)
+        self._processes = processes
+        self.starmap_sizes = []
+
+    def starmap(self, func, iterable):
+        iterable = list(iterable)
+        self.starmap_sizes.append(len(iterable))
+        return self._pool.starmap(func, iterable)
+
+    def apply_async(self, func, args):
+        return self._pool.apply_async(func, args)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+
+def make_proof(T, delta, pool=None):
+    x = ClassGroup.from_ab_discriminant(2, 1, D)
+    powers = iterate_squarings(x, cache_indeces_for_count(T))
+    y = powers[T]
+    proof = generate_proof(x, T, delta, y, powers, x.identity(),
+                           generate_r_value, 64, pool=pool)
+    return x, y, proof
+
+
+def test_product_of_powers():
+    g = ClassGroup.from_ab_discriminant(2, 1, D)
+    identity = g.identity()
+    assert _product_of_powers(identity, []) == identity
+    bases = [g ** 3, g ** 1000, g ** 77777]
+    exponents = [5, 1 << 40, 12345678901]
+    terms = list(zip(bases, exponents))
+    expected = identity
+    for base, exponent in terms:
+        expected = expected * pow(base, exponent)
+    assert _product_of_powers(identity, terms) == expected
+    assert _product_of_powers(identity, terms[:1]) == pow(bases[0], 5)
+
+
+def test_proof_round_trip():
+    T, delta = 1024, 4
+    x, y, proof = make_proof(T, delta)
+    assert verify_proof(x, y, proof, T, delta, generate_r_value, 64)
+    assert not verify_proof(x, y.square(), proof, T, delta,
+                            generate_r_value, 64)
+
+    pool = Pool(2)
+    try:
+        assert make_proof(T, delta, pool=pool)[2] == proof
+    finally:
+        pool.close()
+        pool.join()
+
+
+def test_proof_chunks_by_pool_size(monkeypatch):
+    # 4 cached rounds, the last one has 8 terms of mu
+    T, delta = 16384, 8
+    assert proof_pietrzak.approximate_i(T) == 4
+    # more cpus than the pool has processes, the pool size should be used
+    monkeypatch.setattr(proof_pietrzak.os, "cpu_count", lambda: 64)
+    expected = make_proof(T, delta)
+
+    pool = RecordingPool(1)
+    try:
+        x, y, proof = make_proof(T, delta, pool=pool)
+    finally:
+        pool.close()
+    assert proof == expected[2]
+    assert verify_proof(x, y, proof, T, delta, generate_r_value, 64)
+    assert pool.starmap_sizes == [1, 2, 4, 4]
@@ -0,0 +1,111 @@
+from multiprocessing.dummy import Pool
+
+from inkfish import proof_wesolowski
+from inkfish.classgroup import ClassGroup
+from inkfish.create_discriminant import create_discriminant
+from inkfish.proof_wesolowski import (hash_prime, eval_optimized,
+                                      generate_proof, verify_proof,
+                                      verify_proofs)
+
+
+def make_proof(x, T):
+    y = x
+    for _ in range(T):
+        y = y.square()
+    B = hash_prime(x.serialize() + y.serialize())
+    return (x, y, pow(x, pow(2, T) // B), T)
+
+
+def sample_proofs(D, count):
+    g = ClassGroup.from_ab_discriminant(2, 1, D)
+    return [make_proof(g ** (1000 + i), 40 + 7 * i) for i in range(count)]
+
+
+def test_generate_proof():
+    D = create_discriminant(b"wesolowski", 256)
+    x = ClassGroup.from_ab_discriminant(2, 1, D)
+    T, k, l = 60, 3, 2
+    # C[i] = x^(2^i), generate_proof uses those at multiples of k*l
+    C = {}
+    y = x
+    for i in range(T + 1):
+        C[i] = y
+        y = y.square()
+    y = C[T]
+    proof = generate_proof(x.identity(), x, y, T, k, l, C)
+    assert (x, y, proof, T) == make_proof(x, T)
+    assert verify_proof(x, y, proof, T)
+
+
+def test_eval_optimized_pool(monkeypatch):
+    D = create_discriminant(b"wesolowski", 256)
+    x = ClassGroup.from_ab_discriminant(2, 1, D)
+    T, k, l = 60, 3, 2
+    C = {}
+    y = x
+    for i in range(T + 1):
+        C[i] = y
+        y = y.square()
+    B = hash_prime(x.serialize() + C[T].serialize())
+    expected = eval_optimized(x.identity(), x, B, T, k, l, C)
+    assert expected == pow(x, pow(2, T) // B)
+
+    # more cpus than the pool has processes, the tasks should follow the
+    # pool size: 4 per process split over the l digits, 2 block ranges
+    # for each of the 2 values of j
+    monkeypatch.setattr(proof_wesolowski.os, "cpu_count", lambda: 64)
+    sizes = []
+    with Pool(1) as pool:
+        starmap = pool.starmap
+
+        def recording_starmap(func, tasks):
+            sizes.append(len(tasks))
+            return starmap(func, tasks)
+
+        monkeypatch.setattr(pool, "starmap", recording_starmap)
+        assert eval_optimized(x.identity(), x, B, T, k, l, C,
+                              pool=pool) == expected
+    assert sizes == [4]
+
+
+def test_verify_proofs():
+    D1 = create_discriminant(b"wesolowski", 256)
+    D2 = create_discriminant(b"other", 256)
+    proofs = sample_proofs(D1, 5) + sample_proofs(D2, 3)
+    assert all(verify_proof(*p) for p in proofs)
+    assert verify_proofs(proofs) == [True] * 8
+    with Pool(2) as pool:
+        assert verify_proofs(proofs, pool) == [True] * 8
+    assert verify_proofs([]) == []
+    assert verify_proofs(proofs[:1]) == [True]
+
+
+def test_verify_proofs_finds_bad_proofs():
+    D = create_discriminant(b"wesolowski", 256)
+    proofs = sample_proofs(D, 6)
+    g = proofs[0][0]
+    x, y, proof, T = proofs[1]
+    proofs[1] = (x, y, proof * g, T)
+    x, y, proof, T = proofs[4]
+    proofs[4] = (x, y.square(), proof, T)
+    expected = [True, False, True, True, False, True]
+    assert [verify_proof(*p) for p in proofs] == expected
+    assert verify_proofs(proofs) == expected
+
+
+def test_verify_proofs_low_order_assumption(monkeypatch):
+    # D = -3 * 5 * 7 * 11 * 13 has elements of order 2, such as
+    # (3, 3, 1252), which verify_proof rejects but the batch only rejects
+    # when e is odd
+    D = -3 * 5 * 7 * 11 * 13
+    h = ClassGroup(3, 3, 1252)
+    assert h != h.identity() and h * h == h.identity()
+    proofs = sample_proofs(D, 2)
+    x, y, proof, T = proofs[0]
+    proofs[0] = (x, y * h, proof, T)
+    assert not verify_proof(*proofs[0])
+
+    monkeypatch.setattr(proof_wesolowski.secrets, "randbits", lambda n: 1)
+    assert verify_proofs(proofs) == [True, True]
+    monkeypatch.setattr(proof_wesolowski.secrets, "randbits", lambda n: 0)
+    assert verify_proofs(proofs) == [False, True]
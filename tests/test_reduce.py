@@ -0,0 +1,79 @@
+import random
+
+from algocomp import CostTracking, reduce_form, reduce_form_full
+from algocomp.tracked_number import coerce_int
+
+
+def simple_reduce(a, b, c):
+    """the simple reduction, one division per normalization"""
+    while True:
+        if c < a:
+            a, b, c = c, -b, a
+        if -a < b <= a and a <= c:
+            break
+        n = -((a - b) // (2*a))
+        b, c = b - 2*a*n, c - b*n + a*n*n
+    if a == c and b < 0:
+        b = -b
+    return (a, b, c)
+
+
+def random_forms(bits, count, seed):
+    """random positive definite forms, far from reduced"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        a = rng.getrandbits(bits) + 1
+        c = rng.getrandbits(bits) + 1
+        bound = 2 * (a * c) ** 0.5 if bits < 400 else None
+        if bound is None:
+            # keep b^2 < 4ac without floats
+            b = rng.getrandbits(bits - 1) * rng.choice((1, -1))
+        else:
+            b = rng.randint(-int(bound) + 2, int(bound) - 2)
+        if b * b < 4 * a * c:
+            yield a, b, c
+
+
+def test_boundary_forms_terminate():
+    # b = -a normalizes to b = a, these used to loop forever
+    assert reduce_form_full(2, 6, 20)[:3] == (2, 2, 16)
+    assert reduce_form_full(1, -1, 5)[:3] == (1, 1, 5)
+    assert reduce_form_full(3, -3, 7)[:3] == (3, 3, 7)
+    assert reduce_form_full(5, -2, 5)[:3] == (5, 2, 5)
+
+
+def test_reduce_form_full_matches_simple_reduction():
+    for bits in (20, 100, 600):
+        for a, b, c in random_forms(bits, 50, seed=bits):
+            result = reduce_form_full(a, b, c)
+            assert result[:3] == simple_reduce(a, b, c)
+            assert reduce_form(a, b, c, full=True) == result[:3]
+
+
+def form_action(a, b, c, p, q, r, s):
+    """the form under (x, y) -> (px + qy, rx + sy)"""
+    return (a*p*p + b*p*r + c*r*r,
+            2*(a*p*q + c*r*s) + b*(p*s + q*r),
+            a*q*q + b*q*s + c*s*s)
+
+
+def test_reduce_form_full_tracked_batches():
+    rng = random.Random(7)
+    a, b, c = rng.getrandbits(1024) + 1, 1, rng.getrandbits(1024) + 1
+    # about 150 reduction steps away from reduced
+    form = (a, b, c)
+    for _ in range(150):
+        form = form_action(*form, rng.randint(1, 3), -1, 1, 0)
+    expected = simple_reduce(*form)
+
+    ct = CostTracking()
+    result = reduce_form_full(*(ct.NewNumber(x) for x in form))
+    assert tuple(coerce_int(x) for x in result[:3]) == expected
+    assert ct.num_routine["reduce_form_full"] == 1
+    # each step is charged a division, if only on the leading words
+    assert ct.num_div >= result[3]
+
+    # which is far cheaper than a full width division per step
+    simple_ct = CostTracking()
+    simple_reduce(*(simple_ct.NewNumber(x) for x in form))
+    assert ct.cost * 4 < simple_ct.cost